@@ -0,0 +1,133 @@
+''' times level loading, updating and drawing on generated levels of different sizes
+usage: python benchmark.py --scales 1,4,16 --frames 300 --output ../bench_output.txt
+prints one json object per level size so runs can be compared
+'''
+import os, sys
+import argparse
+import json
+import time
+import tracemalloc
+import headless
+
+def summarize(times):
+    '''mean, median, 95th percentile and max of a list of times, in milliseconds'''
+    if not times:
+        return {'mean': 0, 'median': 0, 'p95': 0, 'max': 0}
+    ordered = sorted(times)
+    return {'mean': 1000*sum(ordered)/len(ordered),
+            'median': 1000*ordered[len(ordered)//2],
+            'p95': 1000*ordered[min(len(ordered)-1, int(len(ordered)*0.95))],
+            'max': 1000*ordered[-1]}
+
+def bench_level(screen, name, frames, rate=120, keys=(), stream=False):
+    '''loads a level and times each update and draw'''
+    import pygame
+    from game import GameState
+    from menu import MenuState
+    from editor import EditorState
+    game = GameState([MenuState, GameState, EditorState])
+    game.streaming = stream
+    start = time.perf_counter()
+    game.start_game(name)
+    load_time = time.perf_counter() - start
+    game.pause = False
+    for key in keys:
+        game.keys[key] = True
+    dt = 1.0/rate
+    update_times = []
+    draw_times = []
+    culled = 0
+    for frame in range(frames):
+        start = time.perf_counter()
+        game.update(dt)
+        middle = time.perf_counter()
+        game.draw(pygame.draw, screen)
+        end = time.perf_counter()
+        update_times.append(middle - start)
+        draw_times.append(end - middle)
+        culled += game.culled
+    game.exit() #stops the prefetch thread before the display goes away
+    return {'load_ms': 1000*load_time,
+            'update_ms': summarize(update_times),
+            'draw_ms': summarize(draw_times),
+            'frame_ms': summarize([update + draw for update, draw in zip(update_times, draw_times)]),
+            'culled_per_frame': culled/max(frames, 1),
+            'texture_cache': game.texture_cache.stats(),
+            'entities': headless.count_entities(game),
+            'stream': game.stream.stats() if game.stream else None}
+
+def entity_memory(count=2000):
+    '''bytes each kind of entity takes, measured by making a lot of them and counting what got allocated'''
+    import game_object
+    from game import GameState
+    from menu import MenuState
+    from editor import EditorState
+    from player import Player
+    from enemy import Enemy
+    from door import Door
+    import level_generator
+    game = GameState([MenuState, GameState, EditorState])
+    game.player = Player(0, 0, level_generator.box(20, 40), [10])
+    makers = {'static': lambda i: game_object.StaticObject(i, 0, level_generator.box(100, 50), [1]),
+              'scenery': lambda i: game_object.SceneryObject(game.texture_cache, i, 0, level_generator.box(100, 50), [0.5, 1, 0, -1]),
+              'scenery image': lambda i: game_object.SceneryObject(game.texture_cache, i, 0, level_generator.box(1, 1), [0.5, 1, 0, level_generator.SCENERY_IMAGES[0]]),
+              'dynamic': lambda i: game_object.DynamicObject(i, 0, level_generator.box(50, 50), [10]),
+              'enemy': lambda i: Enemy(game.player, i, 0, level_generator.box(30, 60), [10, 5, 10, 5]),
+              'player': lambda i: Player(i, 0, level_generator.box(20, 40), [10]),
+              'door': lambda i: Door(game, i, 0, level_generator.box(60, 100), '')}
+    results = {}
+    for name, make in sorted(makers.items()):
+        make(0) #loads any images first so they aren't counted
+        tracemalloc.start()
+        before = tracemalloc.get_traced_memory()[0]
+        entities = [make(i) for i in range(count)]
+        after = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        results[name] = (after - before)/count
+        del entities
+    game.exit()
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description='benchmark generated levels')
+    parser.add_argument('--scales', default='1,4,16', help='comma separated multipliers of the base entity counts')
+    parser.add_argument('--frames', type=int, default=300, help='frames to time for each level')
+    parser.add_argument('--rate', type=int, default=120, help='physics ticks per second of game time')
+    parser.add_argument('--keys', default='', help='keys held for the whole run, like right,up')
+    parser.add_argument('--platforms', type=int, default=50)
+    parser.add_argument('--crates', type=int, default=20)
+    parser.add_argument('--enemies', type=int, default=10)
+    parser.add_argument('--doors', type=int, default=2)
+    parser.add_argument('--scenery', type=int, default=100)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--stream', action='store_true', help='only load the part of each level around the camera')
+    parser.add_argument('--output', help='file to write the results to instead of printing them')
+    parser.add_argument('--memory', action='store_true', help='only measure the bytes each kind of entity takes')
+    args = parser.parse_args()
+    screen = headless.setup()
+    if args.memory:
+        print(json.dumps({'bytes_per_entity': entity_memory()}, sort_keys=True))
+        return
+    import level_generator
+    keys = [key for key in args.keys.split(',') if key]
+    results = []
+    for scale in [float(scale) for scale in args.scales.split(',')]:
+        counts = {'platforms': int(args.platforms*scale),
+                  'crates': int(args.crates*scale),
+                  'enemies': int(args.enemies*scale),
+                  'doors': int(args.doors*scale),
+                  'scenery': int(args.scenery*scale)}
+        name = 'bench/bench_%g' % scale
+        level_generator.write_level(name, level_generator.generate_level(seed=args.seed, **counts))
+        result = {'scale': scale, 'counts': counts, 'frames': args.frames, 'rate': args.rate, 'seed': args.seed, 'streaming': args.stream}
+        result.update(bench_level(screen, name, args.frames, args.rate, keys, args.stream))
+        results.append(json.dumps(result, sort_keys=True))
+        if not args.output:
+            print(results[-1])
+            sys.stdout.flush()
+    if args.output:
+        with open(args.output, 'w') as file:
+            file.write('\n'.join(results) + '\n')
+
+if __name__ == "__main__":
+    main()
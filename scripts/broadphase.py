@@ -0,0 +1,260 @@
+''' spatial hashes used as a broadphase for collision checks and for culling draw layers
+'''
+import pygame, sys
+import math
+
+SNAP_SLOP = 2 #corners can sit a pixel or so past an integer rect, so look a little further than needed
+
+def get_rect(entity):
+    '''default bounds of an entity'''
+    return entity.rect
+
+def get_bounds(entity):
+    '''rect of everything an entity draws'''
+    return entity.get_bounds()
+
+def get_reach(entity):
+    '''rect of everything an entity draws or can be clicked on - rotated images don't always cover the rect'''
+    return entity.rect.union(entity.get_bounds())
+
+class SpatialHash(object):
+    def __init__(self, cell_size=128, bounds=get_rect):
+        '''uniform grid that buckets entities by the cells their rect covers'''
+        self.cell_size = cell_size
+        self.bounds = bounds #function that gives the rect an entity gets bucketed by
+        self.cells = {} #(cell x, cell y) -> set of entities
+        self.entity_cells = {} #entity -> (x0, y0, x1, y1) range of cells it is in
+        self.order = {} #entity -> insertion number, keeps query results in level order
+        self.count = 0
+        self.version = 0 #goes up whenever anything is added, moved or taken out
+
+    def cell_range(self, rect):
+        '''gets the range of cells a rectangle covers'''
+        size = self.cell_size
+        return (rect.left//size, rect.top//size, (rect.right-1)//size, (rect.bottom-1)//size)
+
+    def insert(self, entity, order=None):
+        '''adds an entity to the cells it covers - order places it among the others instead of after them'''
+        if entity in self.entity_cells:
+            return self.move(entity)
+        self.version += 1
+        cells = self.cell_range(self.bounds(entity))
+        self.add_cells(entity, cells)
+        self.entity_cells[entity] = cells
+        if order is None:
+            order = self.count
+        self.order[entity] = order
+        self.count = max(self.count, order + 1)
+
+    def remove(self, entity):
+        '''takes an entity out of the hash'''
+        cells = self.entity_cells.pop(entity, None)
+        if cells is not None:
+            self.version += 1
+            self.remove_cells(entity, cells)
+            del self.order[entity]
+
+    def move(self, entity):
+        '''re-buckets an entity after it moves, does nothing if it stayed in the same cells'''
+        old_cells = self.entity_cells.get(entity)
+        if old_cells is None:
+            return self.insert(entity)
+        self.version += 1 #its corners moved even if its cells didn't
+        cells = self.cell_range(self.bounds(entity))
+        if cells != old_cells:
+            self.remove_cells(entity, old_cells)
+            self.add_cells(entity, cells)
+            self.entity_cells[entity] = cells
+
+    def query(self, rect):
+        '''gets all entities in the cells a rectangle covers - sorted by insertion'''
+        x0, y0, x1, y1 = self.cell_range(rect)
+        cells = self.cells
+        found = set()
+        for x in range(x0, x1+1):
+            for y in range(y0, y1+1):
+                bucket = cells.get((x, y))
+                if bucket:
+                    found.update(bucket)
+        return sorted(found, key=self.order.__getitem__)
+
+    def nearest_corner(self, position, skip=None, radius=64):
+        '''
+        (squared distance, corner) of the closest corner to a position, skipping one entity
+        looks in a square around the position that doubles until it has a corner closer than its edge,
+        corners have to be inside the entities' bounds for that to find the closest one
+        '''
+        x, y = position
+        while True:
+            size = self.cell_size
+            reach = radius + SNAP_SLOP
+            rect = pygame.Rect(math.floor(x - reach), math.floor(y - reach), 2*reach + 1, 2*reach + 1)
+            if (rect.width//size + 2)*(rect.height//size + 2) > len(self.cells):
+                #the square covers more cells than have anything in them, just check everything
+                return closest_corner(sorted(self.entity_cells, key=self.order.__getitem__), position, skip)
+            best = closest_corner(self.query(rect), position, skip)
+            if best[0] <= radius*radius:
+                return best
+            radius *= 2
+
+    def build(self, entities):
+        '''clears the hash and inserts a list of entities'''
+        self.clear()
+        for entity in entities:
+            self.insert(entity)
+
+    def clear(self):
+        '''removes everything from the hash'''
+        self.cells = {}
+        self.entity_cells = {}
+        self.order = {}
+        self.count = 0
+        self.version += 1
+
+    def add_cells(self, entity, cells):
+        '''puts the entity in each cell of the range'''
+        x0, y0, x1, y1 = cells
+        for x in range(x0, x1+1):
+            for y in range(y0, y1+1):
+                bucket = self.cells.get((x, y))
+                if bucket is None:
+                    self.cells[(x, y)] = bucket = set()
+                bucket.add(entity)
+
+    def remove_cells(self, entity, cells):
+        '''takes the entity out of each cell of the range'''
+        x0, y0, x1, y1 = cells
+        for x in range(x0, x1+1):
+            for y in range(y0, y1+1):
+                bucket = self.cells.get((x, y))
+                if bucket is not None:
+                    bucket.discard(entity)
+                    if not bucket:
+                        del self.cells[(x, y)]
+
+    def __contains__(self, entity):
+        return entity in self.entity_cells
+
+    def __len__(self):
+        return len(self.entity_cells)
+
+def closest_corner(entities, position, skip=None):
+    '''(squared distance, corner) of the closest corner of a list of entities, the first one wins ties'''
+    x, y = position
+    best = math.inf
+    closest = None
+    for entity in entities:
+        if entity is not skip:
+            for point in entity.get_corners():
+                dist = (x - point[0])**2 + (y - point[1])**2
+                if dist < best:
+                    best = dist
+                    closest = point
+    return best, closest
+
+class LayerIndex(object):
+    def __init__(self, cell_size=256, band_size=0.05):
+        '''
+        spatial index for a draw layer - entities with parallax move at different speeds on screen,
+        so they get split into bands of similar parallax that each have their own spatial hash
+        '''
+        self.cell_size = cell_size
+        self.band_size = band_size
+        self.bands = {} #band -> spatial hash
+        self.entity_band = {} #entity -> band it is in
+        self.order = {} #entity -> insertion number, keeps things in layer order
+        self.count = 0
+        self.version = 0 #goes up whenever anything is added, moved or taken out
+
+    def get_band(self, entity):
+        '''band of parallax an entity falls in'''
+        return int(round(getattr(entity, 'parallax', 1)/self.band_size))
+
+    def insert(self, entity, order=None):
+        '''adds an entity to the index - order places it among the others instead of after them'''
+        if entity in self.entity_band:
+            return self.move(entity)
+        if order is None:
+            order = self.count
+        self.version += 1
+        band = self.get_band(entity)
+        if band not in self.bands:
+            self.bands[band] = SpatialHash(self.cell_size, get_reach)
+        self.bands[band].insert(entity, order)
+        self.entity_band[entity] = band
+        self.order[entity] = order
+        self.count = max(self.count, order + 1)
+
+    def remove(self, entity):
+        '''takes an entity out of the index'''
+        band = self.entity_band.pop(entity, None)
+        if band is not None:
+            self.version += 1
+            self.bands[band].remove(entity)
+            if not len(self.bands[band]):
+                del self.bands[band]
+            del self.order[entity]
+
+    def move(self, entity):
+        '''re-buckets an entity after it moves'''
+        band = self.entity_band.get(entity)
+        if band is None:
+            return self.insert(entity)
+        self.version += 1
+        self.bands[band].move(entity)
+
+    def build(self, entities):
+        '''clears the index and inserts a list of entities'''
+        self.clear()
+        for entity in entities:
+            self.insert(entity)
+
+    def clear(self):
+        '''removes everything from the index'''
+        self.bands = {}
+        self.entity_band = {}
+        self.order = {}
+        self.count = 0
+        self.version += 1
+
+    def query(self, rect):
+        '''entities whose bounds are in the cells a world rectangle covers, ignoring parallax - in layer order'''
+        found = []
+        for spatial_hash in self.bands.values():
+            found.extend(spatial_hash.query(rect))
+        found.sort(key=lambda entity: (getattr(entity, 'parallax', 1), self.order[entity]))
+        return found
+
+    def nearest_corner(self, position, skip=None):
+        '''(squared distance, corner) of the closest corner in any band - snapping is in world space so parallax doesn't matter'''
+        best = (math.inf, None)
+        for band in sorted(self.bands):
+            found = self.bands[band].nearest_corner(position, skip)
+            if found[0] < best[0]:
+                best = found
+        return best
+
+    def visible(self, camera, margin=0):
+        '''entities that are on screen through the camera, in draw order'''
+        found = []
+        screens = {} #parallax -> part of the world on screen
+        for band, spatial_hash in self.bands.items():
+            #the screen moves linearly with parallax, so the screens at both ends of the band cover everything in it
+            low = camera.world_rect((band - 0.5)*self.band_size)
+            high = camera.world_rect((band + 0.5)*self.band_size)
+            for entity in spatial_hash.query(low.union(high).inflate(margin*2, margin*2)):
+                parallax = getattr(entity, 'parallax', 1)
+                screen = screens.get(parallax)
+                if screen is None:
+                    screen = screens[parallax] = camera.world_rect(parallax).inflate(margin*2, margin*2)
+                if screen.colliderect(get_bounds(entity)):
+                    found.append(entity)
+        #draw back to front like the layer, which is kept sorted by parallax
+        found.sort(key=lambda entity: (getattr(entity, 'parallax', 1), self.order[entity]))
+        return found
+
+    def __contains__(self, entity):
+        return entity in self.entity_band
+
+    def __len__(self):
+        return len(self.entity_band)
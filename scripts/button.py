@@ -6,6 +6,7 @@ parent class for all objects used in game
 
 import pygame, sys
 import math
+import utilities
 
 def buttons_init(parent):
     ''''creates the necessary variables for the buttons'''
@@ -31,7 +32,7 @@ def buttons_mousedown(parent, buttons):
                 parent.last_click = checkButtons(buttons, pygame.mouse.get_pos())
                 if parent.last_click:
                     parent.last_click.font.set_bold(True)
-                    parent.last_click.label = parent.last_click.font.render(parent.last_click.text, 1, (255,0,0))
+                    parent.last_click.set_label(parent.last_click.text, (255,0,0))
 
 def buttons_mouseup(parent, buttons):
     '''update the buttons when mouse is released the buttons'''
@@ -43,10 +44,10 @@ def buttons_mouseup(parent, buttons):
             else:
                 parent.current_button.onClick()
             parent.last_click.font.set_bold(False)
-            parent.last_click.label = parent.last_click.font.render(parent.last_click.text, 1, parent.last_click.color)
+            parent.last_click.set_label(parent.last_click.text, parent.last_click.color)
         else:
             parent.last_click.font.set_bold(False)
-            parent.last_click.label = parent.last_click.font.render(parent.last_click.text, 1, parent.last_click.color)
+            parent.last_click.set_label(parent.last_click.text, parent.last_click.color)
     parent.last_click = None
 
 def checkButtons(buttons, mouse):
@@ -72,24 +73,34 @@ class Button():
         self.value = value #if the buttun has a changing value
         self.attr = attr #for remembering what attribute is being stored
         self.font = font
-        self.label = self.font.render(self.text, 1, self.color)
+        self.label_key = None #what the label shows, so it is only rendered when that changes
+        self.set_label(self.text, self.color)
         width, height = font.size(self.text)
         self.rect = pygame.Rect(x, y, width, height)
 
     def update(self, mouse):
         '''updates the button'''
-        #this resets the color only once, instead of everyframe
         if self.rect.collidepoint(mouse):
-            self.label = self.font.render(self.text + str(self.value), 1, (255,0,0))
+            self.set_label(self.text + str(self.value), (255,0,0))
             self.hover = 1
-        elif self.hover == 0 or self.value != '':
-            self.label = self.font.render(self.text + str(self.value), 1, self.color)
-            self.hover = 2
-        self.hover = 0
+        else:
+            self.set_label(self.text + str(self.value), self.color)
+            self.hover = 0
+
+    def set_label(self, text, color):
+        '''renders the label if the text, color or boldness changed'''
+        key = (text, color, self.font.get_bold())
+        if key != self.label_key:
+            self.label = utilities.render_label(self.font, text, color)
+            self.label_key = key
     
     def draw(self, screen, camera):
         '''draw the button'''
         screen.blit(self.label, (self.rect.x, self.rect.y))
+
+    def get_bounds(self):
+        '''rectangle the label gets drawn in - it can be wider than rect once a value is added'''
+        return pygame.Rect(self.rect.topleft, self.label.get_size())
         
     def realign(self, camera):
         '''realigns the button based on the percent given to align'''
@@ -9,17 +9,26 @@ class Camera(object):
     def __init__(self, width, height, target): #http://stackoverflow.com/questions/14354171/add-scrolling-to-a-platformer-in-pygame/14357169#14357169
         '''create a viewport for the gam'''
         self.viewport = pygame.Rect(0, 0, width, height)
+        self.alpha = 1 #how far between the last two physics steps things get drawn
         try:
             self.target = target
         except:
             self.target = 0
     def apply(self, points, parallax=1):
-        '''position relative to parallax'''
-        for i in range(len(points)):
-            translate_x = points[i][0] - self.viewport.x * parallax + self.viewport.width//2
-            translate_y = points[i][1] - self.viewport.y * parallax + self.viewport.height//2
-            points[i] = (translate_x, translate_y)
-        return points
+        '''position relative to parallax - gives back a new list'''
+        return self.apply_many([points], parallax)[0]
+
+    def apply_many(self, point_lists, parallax=1):
+        '''applies camera logic to a lot of lists of points that have the same parallax in one go'''
+        shift_x = self.viewport.x * parallax
+        shift_y = self.viewport.y * parallax
+        half_width = self.viewport.width//2
+        half_height = self.viewport.height//2
+        return [[(x - shift_x + half_width, y - shift_y + half_height) for x, y in points] for points in point_lists]
+
+    def get_key(self, parallax=1):
+        '''everything a transform depends on - screen corners made with the same key are still right'''
+        return (self.viewport.x, self.viewport.y, self.viewport.width, self.viewport.height, parallax)
 
     def apply_single(self, point, parallax=1):
         '''applies camera logic to single point'''
@@ -33,6 +42,12 @@ class Camera(object):
         translate_y = mouse[1] + self.viewport.y * parallax - self.viewport.height//2
         return (int(translate_x), int(translate_y))
 
+    def world_rect(self, parallax=1):
+        '''part of the world that is on screen for a parallax'''
+        return pygame.Rect(self.viewport.x * parallax - self.viewport.width//2,
+                           self.viewport.y * parallax - self.viewport.height//2,
+                           self.viewport.width, self.viewport.height).inflate(2, 2) #rounding
+
     def update(self, keys, dt):
         '''updates camera position'''
         if self.target == 0: #free movement
@@ -53,6 +68,14 @@ class Camera(object):
             self.viewport.x = self.target.rect.centerx
             self.viewport.y = self.target.rect.centery
 
+    def interpolate(self, alpha):
+        '''sets the draw position between physics steps and moves a following camera with its target'''
+        self.alpha = alpha
+        if self.target != 0 and self.target != 1:
+            offset_x, offset_y = self.target.interpolation_offset(alpha)
+            self.viewport.x = self.target.rect.centerx + offset_x
+            self.viewport.y = self.target.rect.centery + offset_y
+
     def resize(self, screen):
         '''resizes the camera'''
         screen_size = screen.get_size()
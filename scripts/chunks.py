@@ -0,0 +1,110 @@
+''' pre-renders static platforms into chunks of the world so they can be drawn with a few blits
+'''
+import pygame, sys
+from collections import OrderedDict
+import broadphase
+
+class ChunkCache(object):
+    COLORKEY = (255, 0, 255) #transparent color of the chunks, nothing static is drawn with it
+    def __init__(self, chunk_size=256, max_chunks=128):
+        '''cache of surfaces with the static objects drawn on them, one per square chunk of the world'''
+        self.chunk_size = chunk_size
+        self.max_chunks = max_chunks #most chunk surfaces kept around, least recently drawn go first
+        self.index = broadphase.SpatialHash(chunk_size, broadphase.get_bounds) #cells line up with the chunks
+        self.bounds = {} #entity -> bounds it was drawn into the chunks with
+        self.chunks = OrderedDict() #(chunk x, chunk y) -> surface
+        self.empty = set() #chunks with nothing in them
+
+    def build(self, entities, area=None):
+        '''adds the static objects from a list, and renders the chunks around an area up front'''
+        self.clear()
+        for entity in entities:
+            if entity.type == 'static':
+                self.insert(entity)
+        if area is not None:
+            for key in self.chunk_keys(area):
+                self.get_chunk(key)
+
+    def clear(self):
+        '''removes everything from the cache'''
+        self.index.clear()
+        self.bounds = {}
+        self.chunks = OrderedDict()
+        self.empty = set()
+
+    def insert(self, entity):
+        '''adds a static object and marks its chunks for redrawing'''
+        self.index.insert(entity)
+        bounds = pygame.Rect(entity.get_bounds())
+        self.bounds[entity] = bounds
+        self.invalidate(bounds)
+
+    def remove(self, entity):
+        '''removes a static object and marks its chunks for redrawing'''
+        if entity in self.bounds:
+            self.index.remove(entity)
+            self.invalidate(self.bounds.pop(entity))
+
+    def move(self, entity):
+        '''redraws the chunks an object was in and the chunks it is in now'''
+        if entity in self.bounds:
+            self.invalidate(self.bounds[entity])
+            self.index.move(entity)
+            self.bounds[entity] = pygame.Rect(entity.get_bounds())
+            self.invalidate(self.bounds[entity])
+
+    def invalidate(self, rect):
+        '''throws away the chunks a rectangle covers so they get drawn again'''
+        for key in self.chunk_keys(rect):
+            self.chunks.pop(key, None)
+            self.empty.discard(key)
+
+    def chunk_keys(self, rect):
+        '''keys of the chunks a rectangle covers'''
+        x0, y0, x1, y1 = self.index.cell_range(rect)
+        return [(x, y) for x in range(x0, x1+1) for y in range(y0, y1+1)]
+
+    def get_chunk(self, key):
+        '''gets the surface for a chunk, drawing it if needed - None if it has nothing in it'''
+        if key in self.empty:
+            return None
+        surface = self.chunks.get(key)
+        if surface is None:
+            surface = self.render(key)
+            if surface is None:
+                self.empty.add(key)
+                return None
+            self.chunks[key] = surface
+        else:
+            self.chunks.move_to_end(key)
+        return surface
+
+    def render(self, key):
+        '''draws the static objects in a chunk onto a new surface'''
+        size = self.chunk_size
+        area = pygame.Rect(key[0]*size, key[1]*size, size, size)
+        entities = [entity for entity in self.index.query(area) if area.colliderect(entity.get_bounds())]
+        if not entities:
+            return None
+        surface = pygame.Surface((size, size))
+        if pygame.display.get_surface() is not None:
+            surface = surface.convert()
+        surface.fill(self.COLORKEY)
+        for entity in entities:
+            points = [(x - area.x, y - area.y) for x, y in entity.get_corners()]
+            pygame.draw.polygon(surface, entity.color, points, 0)
+        #run length encoding makes blitting the big empty parts of a chunk nearly free
+        surface.set_colorkey(self.COLORKEY, pygame.RLEACCEL)
+        return surface
+
+    def draw(self, screen, camera):
+        '''blits the chunks that are on screen'''
+        size = self.chunk_size
+        keys = self.chunk_keys(camera.world_rect())
+        for key in keys:
+            surface = self.get_chunk(key)
+            if surface is not None:
+                screen.blit(surface, camera.apply_single((key[0]*size, key[1]*size)))
+        #forget the chunks that have been off screen the longest
+        while len(self.chunks) > max(self.max_chunks, len(keys)):
+            self.chunks.popitem(last=False)
@@ -12,19 +12,22 @@ class Door(GameObject):
     ''' 
     door for switching levels
     '''
+    __slots__ = ['gameRef', 'player', 'link']
+    type = 'door'
     ATTRIBUTES = []
+    PREFETCH_DISTANCE = 600 #how close the player gets before the next room starts loading in the background
     def __init__(self, gameRef, x, y, offsets, link=''):
         GameObject.__init__(self, x, y, offsets)
         self.gameRef = gameRef
         self.player = self.gameRef.player
         self.link = link #link to the next room
-        self.type = 'door'
         self.color = (0,255,255)
-        self.parallax = 1 #sorting purposes
 
     def update(self, dt):
         #player and gameRef get set elsewhere
-        if self.rect.colliderect(self.player) and self.player.past_up:
+        if self.link and self.rect.inflate(self.PREFETCH_DISTANCE*2, self.PREFETCH_DISTANCE*2).colliderect(self.player.rect):
+            self.gameRef.prefetcher.request(self.link)
+        if self.rect.colliderect(self.player.rect) and self.player.past_up:
             try:
                 self.gameRef.start_game(self.link)
                 self.gameRef.camera.viewport.x = self.player.rect.centerx 
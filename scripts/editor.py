@@ -13,6 +13,8 @@ import utilities
 import button
 import textbox
 import door
+import snapshot
+from profiler import profile
 from game import GameState
 from camera import Camera
 from player import Player
@@ -21,10 +23,13 @@ class EditorState(GameState):
     def __init__(self, states):
         '''initiate the editor''' 
         super(EditorState, self).__init__(states) #initialize the game, also initializes the menu
+        self.streaming = False #saving writes out what is loaded, so the editor always loads the whole level
         #setup player
         self.player = Player(0, 0, [(0,0),(0,40),(20,40),(20,0)], [10, 0.9])
         self.player.adjust_collision()
-        self.gameEntities.append(self.player)
+        self.add_entity(self.gameEntities, self.player)
+        #reset puts the level back to this, edits keep it up to date
+        self.snapshot = snapshot.Snapshot(self)
         #center the camera on the player
         self.camera.viewport.x = self.player.rect.centerx 
         self.camera.viewport.y = self.player.rect.centery
@@ -33,6 +38,8 @@ class EditorState(GameState):
         #variables for all the editing - used later in the code
         self.parallax = 1
         self.snap_to = (0, 0)
+        self.snap_key = None #what the last snap was worked out for
+        self.snap_corner = None
         self.line_to = [(0, 0), (0, 0)]
         self.init_pos = (0, 0)
         self.origin = (0, 0)
@@ -93,7 +100,14 @@ class EditorState(GameState):
                     if entity.dynamic:
                         entity.pos[0] = entity.rect.x
                         entity.pos[1] = entity.rect.y 
+                        entity.prev_pos[0] = entity.rect.x
+                        entity.prev_pos[1] = entity.rect.y
                         entity.spawn = (entity.rect.x, entity.rect.y)
+                        self.snapshot.save(entity)
+                    self.move_entity(entity)
+                    if entity in self.broadphase:
+                        #whatever was resting on or against it has to react
+                        self.wake_area(entity.rect.inflate(4, 4))
         #perform game logic if game is running
         if not self.pause:
             #run the game
@@ -102,25 +116,71 @@ class EditorState(GameState):
             #otherwise run regular camera
             self.camera.update(self.editor_keys, dt)
         
+    def idle(self):
+        '''if nothing is moving - the editor is still while paused unless the camera is moving or the mouse is held down'''
+        moving = [self.editor_keys[key] for key in ['up', 'down', 'left', 'right']]
+        return self.pause and not any(moving) and not any(pygame.mouse.get_pressed())
+
     def draw(self, draw, screen):
-        '''loop through objects and draw them'''
+        '''
+        loop through objects and draw them
+        returns the parts of the screen that changed, or None if all of it did
+        '''
+        if self.pause:
+            #nothing moves while paused, so draw bodies where they are instead of between steps
+            self.camera.interpolate(1)
+        key = (self.camera.get_key(), screen.get_size(), self.tool, id(self.get_layer()))
+        rects = self.overlay_rects() + self.menu_rects(screen)
+        if self.pause and self.frame.valid(key):
+            #nothing in the level changed, so only the editor visuals get drawn again
+            dirty = self.frame.restore(screen, rects)
+            self.draw_overlays(screen)
+            self.draw_menu(screen)
+            return dirty
         screen.fill(pygame.Color(255, 255, 255))
-        for entity in self.backGroundEntities:
+        self.culled = 0
+        profile.start('draw.background')
+        for entity in self.visible_entities(self.backGroundEntities):
             entity.draw(screen, self.camera)
             if self.tool == 1 and self.get_layer() == self.backGroundEntities:
                 entity.debug_draw(screen, self.camera)
-        for entity in self.gameEntities:
-            entity.draw(screen, self.camera)
+        profile.stop('draw.background')
+        profile.start('draw.platforms')
+        self.static_chunks.draw(screen, self.camera)
+        profile.stop('draw.platforms')
+        profile.start('draw.game')
+        game_visible = self.visible_entities(self.gameEntities)
+        for entity in game_visible:
+            if entity.type != 'static': #already in the chunks
+                entity.draw(screen, self.camera)
             if self.tool == 1 and self.get_layer() == self.gameEntities:
                 entity.debug_draw(screen, self.camera)
             elif self.tool == 2 and entity in self.selected:
                 entity.debug_draw(screen, self.camera)
-        for entity in self.foreGroundEntities:
+        self.draw_player_hud(screen, game_visible)
+        profile.stop('draw.game')
+        profile.start('draw.foreground')
+        for entity in self.visible_entities(self.foreGroundEntities):
             entity.draw(screen, self.camera)
             if self.tool == 1 and self.get_layer() == self.foreGroundEntities:
                 entity.debug_draw(screen, self.camera)
             elif self.tool == 2 and entity in self.selected:
                 entity.debug_draw(screen, self.camera)
+        profile.stop('draw.foreground')
+        #holding the mouse down erases and drags things, so the frame would be out of date straight away
+        if self.pause and not any(pygame.mouse.get_pressed()):
+            self.frame.save(screen, key, rects)
+        else:
+            self.frame.clear()
+        profile.start('draw.menu')
+        self.draw_overlays(screen)
+        #draw the editor over top everything
+        self.draw_menu(screen)
+        profile.stop('draw.menu')
+        return None
+
+    def draw_overlays(self, screen):
+        '''draws what is being drawn and the snapping and selecting visuals'''
         #draw what is being drawn
         if self.continue_draw:
             self.current_draw.draw(screen, self.camera)
@@ -133,10 +193,33 @@ class EditorState(GameState):
         if pygame.mouse.get_pressed()[0] and self.tool == 2 and not self.drag:
             position = self.camera.apply_single((self.selector_rect.x, self.selector_rect.y), self.parallax)
             pygame.draw.rect(screen, (255,0,0), (position[0], position[1], self.selector_rect.width, self.selector_rect.height), 2)
-        #draw the editor over top everything
-        self.draw_menu(screen)
+
+    def overlay_rects(self):
+        '''parts of the screen draw_overlays draws on'''
+        rects = []
+        if self.continue_draw:
+            points = self.current_draw.get_screen_corners(self.camera)
+            left, top = min(point[0] for point in points), min(point[1] for point in points)
+            right, bottom = max(point[0] for point in points), max(point[1] for point in points)
+            rects.append(pygame.Rect(left, top, right - left + 1, bottom - top + 1).inflate(2, 2))
+        if self.editor_keys['ctrl']:
+            rects.append(pygame.Rect(0, 0, 17, 17))
+            rects[-1].center = self.camera.apply_single(self.snap_to, self.parallax)
+        if self.editor_keys['shift']:
+            start = self.camera.apply_single(self.line_to[0], self.parallax)
+            end = self.camera.apply_single(self.line_to[1], self.parallax)
+            rects.append(pygame.Rect(min(start[0], end[0]), min(start[1], end[1]), abs(end[0] - start[0]) + 1, abs(end[1] - start[1]) + 1).inflate(6, 6))
+        if pygame.mouse.get_pressed()[0] and self.tool == 2 and not self.drag:
+            position = self.camera.apply_single((self.selector_rect.x, self.selector_rect.y), self.parallax)
+            rect = pygame.Rect(position[0], position[1], self.selector_rect.width, self.selector_rect.height)
+            rect.normalize()
+            rects.append(rect.inflate(4, 4))
+        return rects
+
     def eventHandler(self, event):
         '''handles user inputs'''
+        if event.type != pygame.MOUSEMOTION:
+            self.frame.clear() #clicks and keys can change the level
         #special case
         if self.textbox.active:
             self.textbox.key_in(event)
@@ -225,10 +308,8 @@ class EditorState(GameState):
                             if self.draw_type == game_object.SceneryObject and self.current_draw.hasImage:
                                 self.current_draw.rect.centerx, self.current_draw.rect.centery = self.origin
                                 layer = self.get_layer()
-                                layer.append(self.current_draw)
-                                #resort list to simulate depth
-                                if hasattr(self.current_draw, 'parallax'):
-                                    layer.sort(key=lambda x: x.parallax, reverse=False)
+                                self.add_by_parallax(layer, self.current_draw)
+                                self.snapshot.add(self, layer, self.current_draw)
                                 self.current_draw = None
                                 self.continue_draw = False
                         else:
@@ -251,10 +332,8 @@ class EditorState(GameState):
                             #delete object if it is too small
                             if not (self.current_draw.rect.width < 0.2 or self.current_draw.rect.height < 0.2):
                                 layer = self.get_layer()
-                                layer.append(self.current_draw)
-                                #resort list to simulate depth
-                                if hasattr(self.current_draw, 'parallax'):
-                                    layer.sort(key=lambda x: x.parallax, reverse=False)
+                                self.add_by_parallax(layer, self.current_draw)
+                                self.snapshot.add(self, layer, self.current_draw)
                             #clear the draw variables   
                             self.current_draw = None
                             self.continue_draw = False
@@ -300,15 +379,11 @@ class EditorState(GameState):
                 if self.tool == 2:
                     if not self.drag:
                         self.selector_rect.normalize()
-                        for entity in self.backGroundEntities:
-                            if self.selector_rect.colliderect(entity):
-                                self.selected.append(entity)
-                        for entity in self.gameEntities:
-                            if self.selector_rect.colliderect(entity):
-                                self.selected.append(entity)
-                        for entity in self.foreGroundEntities:
-                            if self.selector_rect.colliderect(entity):
-                                self.selected.append(entity)
+                        #only look at what is near the box
+                        for layer in [self.backGroundEntities, self.gameEntities, self.foreGroundEntities]:
+                            for entity in self.index_for(layer).query(self.selector_rect):
+                                if self.selector_rect.colliderect(entity.rect):
+                                    self.selected.append(entity)
                     else:
                         self.drag = False
                         self.selected = []          
@@ -336,17 +411,15 @@ class EditorState(GameState):
                 point_list.pop(3)
             return point_list
     def snap_to_corner(self, position, entity_list):
-        '''snaps position to the nearest corner'''
-        min_dist = math.inf
-        closest_pos = position
-        for entity in entity_list:
-            if entity != self.current_draw:
-                for point in entity.get_corners():
-                    dist = math.hypot(position[0] - point[0], position[1] - point[1]) 
-                    if dist < min_dist:
-                        min_dist = dist
-                        closest_pos = point
-        return closest_pos
+        '''snaps position to the nearest corner - kept until the mouse or the layer changes'''
+        index = self.index_for(entity_list)
+        key = (tuple(position), index, index.version, self.current_draw)
+        if key != self.snap_key:
+            self.snap_corner = index.nearest_corner(position, self.current_draw)[1]
+            self.snap_key = key
+        if self.snap_corner is None:
+            return position
+        return self.snap_corner
     def snap_to_plane(self, position, entity_list):
         '''snaps position to the nearest corner'''
         closest_pos = self.snap_to_corner(position, entity_list)
@@ -356,10 +429,29 @@ class EditorState(GameState):
             return [closest_pos, (closest_pos[0], position[1])]
     
     def delete_object(self, position, entity_list):
-        '''destroys object in list'''
-        for i in reversed(range(len(entity_list))):
-            if entity_list[i].rect.collidepoint(position):
-                entity_list.pop(i)
+        '''destroys the objects in the list under a position'''
+        #collidepoint drops the fraction, so look at the pixels around it and check them properly
+        near = pygame.Rect(int(position[0]) - 1, int(position[1]) - 1, 3, 3)
+        for entity in reversed(self.index_for(entity_list).query(near)):
+            if entity.rect.collidepoint(position):
+                self.remove_entity(entity_list, entity)
+                self.snapshot.remove(entity)
+                #objects resting on it should fall
+                self.wake_area(entity.rect.inflate(4, 4))
+
+    def add_by_parallax(self, layer, entity):
+        '''adds a drawn entity after everything with the same or less parallax - layers are kept in depth order'''
+        low, high = 0, len(layer)
+        while low < high:
+            middle = (low + high)//2
+            if layer[middle].parallax > entity.parallax:
+                high = middle
+            else:
+                low = middle + 1
+        layer.insert(low, entity)
+        self.index_for(layer).insert(entity)
+        if entity.type == 'static':
+            self.static_chunks.insert(entity)
                 
     def get_layer(self):
         '''gets the layer for drawing'''
@@ -508,6 +600,11 @@ class EditorState(GameState):
         self.textbox.draw(screen)
         self.door_textbox.draw(screen)
         button.buttons_draw(self, screen, self.buttons)
+
+    def menu_rects(self, screen):
+        '''parts of the screen draw_menu draws on'''
+        self.menu_back.height = screen.get_size()[1]
+        return [self.menu_back, self.textbox.get_bounds(), self.door_textbox.get_bounds()] + [entity.get_bounds() for entity in self.buttons]
     
     def toggle_door_textbox(self):
         '''simple fix for togling the textbox'''
@@ -542,15 +639,14 @@ class EditorState(GameState):
     
     def load_images(self, path):
         ''' 
-        Loads image for the editor to use
+        Finds the images for the editor to use, they get loaded the first time they are drawn
         @author: Kristofer Brink (kpb23) 
         '''
         files = sorted(os.listdir('../images/' + path))
         files_png = [i for i in files if i.endswith('.png')]
-        images = {}
+        images = []
         for i in files_png:
             new_path = path + i
-            images[new_path] = self.texture_cache.load(new_path)
-        return images
-
-        
\ No newline at end of file
+            self.texture_cache.register(new_path)
+            images.append(new_path)
+        return images
\ No newline at end of file
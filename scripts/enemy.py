@@ -12,6 +12,8 @@ class Enemy(DynamicObject):
     ''' 
     enemy for attacking player
     '''
+    __slots__ = ['player', 'speed', 'jump', 'engage', 'jump_height', 'max_vel', 'accel', 'radius', 'offset', 'timer']
+    type = 'enemy'
     ATTRIBUTES = [{'name': 'Mass', 'init': 10, 'max': 100, 'min': 1, 'step': 1},
                   {'name': 'Speed', 'init': 10, 'max': 50, 'min': 0, 'step': 1},
                   {'name': 'Jump', 'init': 10, 'max': 30, 'min': 1, 'step': 1},
@@ -22,7 +24,6 @@ class Enemy(DynamicObject):
         self.speed = attributes[1]
         self.jump = attributes[2]
         self.engage = attributes[3]
-        self.type = 'enemy'
         self.color = (0,0,255)
         self.jump_height = self.jump * 50
         self.max_vel = 200*self.speed
@@ -34,10 +35,12 @@ class Enemy(DynamicObject):
         if self.speed == 0:
             self.frozen = True
         
-    def update(self, dt, entities):
+    def update(self, dt, entities, broadphase=None):
         '''updates the enemy'''
-        DynamicObject.update(self, dt, entities)
         #self.player is set in the level load function
+        if self.sleeping and abs(self.player.rect.centerx - self.rect.centerx) < self.radius:
+            self.wake() #wake up when the player gets close
+        DynamicObject.update(self, dt, entities, broadphase)
         if abs(self.player.rect.centerx - self.rect.centerx) < self.radius:
             '''Left and right movement'''
             if self.player.rect.centerx > self.rect.centerx: # Right movement
@@ -54,11 +57,11 @@ class Enemy(DynamicObject):
                     self.vel.y = -self.jump_height
                     self.vel.x += self.jump_height * self.onwall
     
-    def on_collide(self, entities, entity):
+    def on_collide(self, entities, entity, broadphase=None):
         '''called on collision'''
         if entity.type == 'player':
             if self.player.deadly and not self.frozen: #kill enemy
-                entities.remove(self)
+                self.remove_entity(entities, self, broadphase)
             else: #reduce health otherwise
                 self.player.health -= 1
   
@@ -0,0 +1,39 @@
+''' keeps a finished frame so only the parts of the screen that change get drawn again
+'''
+import pygame, sys
+
+class FrameCache(object):
+    def __init__(self):
+        '''a copy of the screen, what it was drawn with, and what got drawn over it since'''
+        self.surface = None
+        self.key = None #everything the frame depends on, a different key means it has to be drawn again
+        self.dirty = [] #rectangles drawn over the frame last time
+
+    def valid(self, key):
+        '''if the saved frame can be used for this key'''
+        return self.surface is not None and key == self.key
+
+    def save(self, screen, key, rects):
+        '''saves the screen before the rectangles get drawn over it'''
+        if self.surface is None or self.surface.get_size() != screen.get_size():
+            self.surface = screen.copy()
+        else:
+            self.surface.blit(screen, (0, 0))
+        self.key = key
+        self.dirty = [pygame.Rect(rect) for rect in rects]
+
+    def restore(self, screen, rects):
+        '''
+        puts the saved frame back under the rectangles drawn last time and the ones about to be drawn
+        returns all of them for pygame.display.update
+        '''
+        rects = [pygame.Rect(rect) for rect in rects]
+        dirty = rects + [rect for rect in self.dirty if rect not in rects] #most things are where they were
+        for rect in dirty:
+            screen.blit(self.surface, rect, rect)
+        self.dirty = rects
+        return dirty
+
+    def clear(self):
+        '''forgets the frame so the next one gets drawn fully'''
+        self.key = None
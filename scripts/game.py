@@ -5,27 +5,45 @@ contains game logic and draw calls
 '''
 
 import pygame, sys
-import math,json
+import math
 import random
 import game_object
 import button
 import utilities
 import textbox
+import broadphase
+import chunks
+import level_format
+import streaming
+import prefetch
+import snapshot
+import frame_cache
+from profiler import profile
 from camera import Camera
 from player import Player
 from enemy import Enemy
 from door import Door
 
 class GameState():
+    CULL_MARGIN = 64 #extra distance past the screen that still gets drawn
+    PRERENDER_SIZE = (2048, 1536) #area around the player that gets its platforms drawn when a level loads
+    STREAM = False #default for streaming levels in around the camera instead of loading them all at once
     def __init__(self, states): 
         '''initiate the game'''
         self.states = states
         self.gameEntities = [] #blocks and other objects that collide
         self.backGroundEntities = [] #scenery and other things that don't collide
         self.foreGroundEntities = [] #scenery and other things that don't collide
+        self.broadphase = broadphase.SpatialHash() #spatial hash of the gameEntities for collision checks
+        #spatial indexes of the scenery layers for culling
+        self.backGroundIndex = broadphase.LayerIndex()
+        self.foreGroundIndex = broadphase.LayerIndex()
+        self.culled = 0 #number of entities skipped in the last draw
+        self.static_chunks = chunks.ChunkCache() #static objects drawn ahead of time
         button.buttons_init(self) #initialize the button class
         #add texture cache for loading images
         self.texture_cache = utilities.Texture_cache()
+        self.prefetcher = prefetch.LevelPrefetcher(self.texture_cache) #loads levels behind doors ahead of time
         #setup game stuff
         self.camera = Camera(900, 600, 0)
         self.camera.resize(pygame.display.get_surface())
@@ -33,39 +51,132 @@ class GameState():
         self.player = None
         self.keys = {'up': False, 'down': False, 'left': False, 'right': False, 'dash': False} #dictionary for key presses
         self.current_file = None
+        self.streaming = self.STREAM #only make the part of the level around the camera
+        self.stream = None
+        self.snapshot = None #state of the level right after it loaded, for respawning
+        self.frame = frame_cache.FrameCache() #the world as it was last drawn, reused under the menu while paused
         self.initialize_menu()#initialize the menu
                 
     def update(self, dt):
         '''loop through objects and run logic'''
         #update the buttons
+        profile.start('update.buttons')
         button.buttons_update(self, self.buttons)
+        profile.stop('update.buttons')
         #send key inputs to player
         if not self.pause:
+            if self.stream is not None:
+                profile.start('update.stream')
+                self.stream.update((self.camera.viewport.x, self.camera.viewport.y), self.camera.viewport.size)
+                profile.stop('update.stream')
+            profile.start('update.input')
             self.player.input(self.keys, dt)
-            for entity in self.backGroundEntities:
-                entity.update(dt)
-            for entity in self.gameEntities:
-                if entity.dynamic:
-                    entity.update(dt, self.gameEntities)
-                else:
-                    entity.update(dt)
-            for entity in self.foreGroundEntities:
-                entity.update(dt)
-            if self.player.health < 0: #reset if player dies
-                self.start_game(self.current_file)
+            profile.stop('update.input')
+            profile.start('update.scenery')
+            self.update_layer(self.backGroundEntities, dt)
+            profile.stop('update.scenery')
+            profile.start('update.physics')
+            self.update_game_entities(dt)
+            profile.stop('update.physics')
+            profile.start('update.scenery')
+            self.update_layer(self.foreGroundEntities, dt)
+            profile.stop('update.scenery')
+            profile.start('update.respawn')
+            self.check_respawn()
+            profile.stop('update.respawn')
         #update the camera
+        profile.start('update.camera')
         self.camera.update(self.keys, dt)
+        profile.stop('update.camera')
+
+    def idle(self):
+        '''if nothing is moving - nothing does while paused, so the screen only changes when there is input'''
+        return self.pause
+
+    def exit(self):
+        '''called when the game is switched away from - stops the prefetch thread so it lets go of this state'''
+        self.prefetcher.stop()
+
+    def update_layer(self, layer, dt):
+        '''updates the entities of a layer that doesn't collide'''
+        for entity in layer:
+            entity.update(dt)
+
+    def update_game_entities(self, dt):
+        '''updates the entities that collide - runs the physics'''
+        for entity in self.gameEntities:
+            if entity.dynamic:
+                entity.update(dt, self.gameEntities, self.broadphase)
+            else:
+                entity.update(dt)
+
+    def check_respawn(self):
+        '''reset if player dies'''
+        if self.player.health < 0:
+            if self.snapshot is not None:
+                #put the level back in place instead of loading it again
+                self.reset_game()
+                self.camera = Camera(900, 600, self.player)
+                self.camera.resize(pygame.display.get_surface())
+            else:
+                self.start_game(self.current_file)
             
     def draw(self, draw, screen):
-        '''loop through objects and draw them'''
+        '''
+        loop through objects and draw them
+        returns the parts of the screen that changed, or None if all of it did
+        '''
+        if self.pause:
+            #nothing moves while paused, so draw things where they are and reuse the last frame
+            self.camera.interpolate(1)
+            key = (self.camera.get_key(), screen.get_size())
+            rects = self.menu_rects(screen)
+            if self.frame.valid(key):
+                dirty = self.frame.restore(screen, rects)
+                self.draw_menu(screen)
+                return dirty
         screen.fill(pygame.Color(255, 255, 255))
-        for entity in self.backGroundEntities:
+        self.culled = 0
+        profile.start('draw.background')
+        for entity in self.visible_entities(self.backGroundEntities):
             entity.draw(screen, self.camera)
-        for entity in self.gameEntities:
-            entity.draw(screen, self.camera)
-        for entity in self.foreGroundEntities:
+        profile.stop('draw.background')
+        profile.start('draw.platforms')
+        self.static_chunks.draw(screen, self.camera)
+        profile.stop('draw.platforms')
+        profile.start('draw.game')
+        game_visible = self.visible_entities(self.gameEntities)
+        for entity in game_visible:
+            if entity.type != 'static': #already in the chunks
+                entity.draw(screen, self.camera)
+        self.draw_player_hud(screen, game_visible)
+        profile.stop('draw.game')
+        profile.start('draw.foreground')
+        for entity in self.visible_entities(self.foreGroundEntities):
             entity.draw(screen, self.camera)
+        profile.stop('draw.foreground')
+        if self.pause:
+            self.frame.save(screen, key, rects)
+        profile.start('draw.menu')
         self.draw_menu(screen)
+        profile.stop('draw.menu')
+        return None
+
+    def visible_entities(self, layer):
+        '''entities of a layer that are on screen, in draw order'''
+        if layer is self.gameEntities:
+            #moving objects are drawn a little behind where they are, so look a bit past the screen
+            screen = self.camera.world_rect().inflate(self.CULL_MARGIN*2, self.CULL_MARGIN*2)
+            visible = [entity for entity in self.broadphase.query(screen) if screen.colliderect(entity.get_bounds())]
+        else:
+            visible = self.index_for(layer).visible(self.camera)
+        self.culled += len(layer) - len(visible)
+        return visible
+
+    def draw_player_hud(self, screen, visible):
+        '''the player draws the health bars, so draw them even if the player is off screen'''
+        if self.player is not None and self.player in self.broadphase and self.player not in visible:
+            self.player.draw_hud(screen)
         
     def eventHandler(self, event):
         '''handles input events'''
@@ -150,6 +261,15 @@ class GameState():
             self.textbox.draw(screen)
         button.buttons_draw(self, screen, self.buttons)
 
+    def menu_rects(self, screen):
+        '''parts of the screen draw_menu draws on'''
+        rects = [entity.get_bounds() for entity in self.buttons]
+        if self.pause:
+            self.menu_back.centerx = screen.get_size()[0]/2
+            self.menu_back.centery = screen.get_size()[1]/2
+            rects += [self.menu_back, self.textbox.get_bounds()]
+        return rects
+
     def create_pause(self):
         '''pause button for the game'''
         self.pauseButton = button.Button(-100, 0, self.button_font_big, (0,0,0), 100, 'Pause', (1,0))
@@ -162,6 +282,7 @@ class GameState():
     def switch_menu(self):
         '''switches the menu state'''
         self.pause = not self.pause
+        self.frame.clear() #the saved frame still has the buttons of the other menu on it
         if not self.pause:
             #switch to game play
             self.buttons[:] = []
@@ -184,21 +305,114 @@ class GameState():
     def from_dictionary(self, dictionary):
         '''load level from a dictionary'''
         self.player = Player(**{key: value for (key, value) in dictionary['player'].items()})
-        enemies = [Enemy(self.player,**{key: value for (key, value) in i.items()}) for i in dictionary['enemies']]
-        doors = [Door(self,**{key: value for (key, value) in i.items()}) for i in dictionary['doors']]
-        dynamic = [game_object.DynamicObject(**{key: value for (key, value) in i.items()}) for i in dictionary['dynamicEntities']]
-        static = [game_object.StaticObject(**{key: value for (key, value) in i.items()}) for i in dictionary['staticEntities']]
-        self.gameEntities = dynamic + static + enemies
-        self.gameEntities.append(self.player)
-        backGround = [game_object.SceneryObject(self.texture_cache,**{key: value for (key, value) in i.items()}) for i in dictionary['backGroundEntities']]
-        self.foreGroundEntities = [game_object.SceneryObject(self.texture_cache,**{key: value for (key, value) in i.items()}) for i in dictionary['foreGroundEntities']]
-        self.backGroundEntities = backGround + doors
+        self.stream = None
+        if self.streaming:
+            #only the player gets made now, the stream makes the rest as the camera gets close
+            self.gameEntities = [self.player]
+            self.backGroundEntities = []
+            self.foreGroundEntities = []
+        else:
+            enemies = [self.make_entity('enemies', i) for i in dictionary['enemies']]
+            doors = [self.make_entity('doors', i) for i in dictionary['doors']]
+            dynamic = [self.make_entity('dynamicEntities', i) for i in dictionary['dynamicEntities']]
+            static = [self.make_entity('staticEntities', i) for i in dictionary['staticEntities']]
+            self.gameEntities = dynamic + static + enemies
+            self.gameEntities.append(self.player)
+            backGround = [self.make_entity('backGroundEntities', i) for i in dictionary['backGroundEntities']]
+            self.foreGroundEntities = [self.make_entity('foreGroundEntities', i) for i in dictionary['foreGroundEntities']]
+            self.backGroundEntities = backGround + doors
+        #static objects get bucketed once here, dynamic objects re-bucket themselves as they move
+        self.broadphase.build(self.gameEntities)
+        self.backGroundIndex.build(self.backGroundEntities)
+        self.foreGroundIndex.build(self.foreGroundEntities)
+        if self.streaming:
+            self.stream = streaming.LevelStream(self, dictionary, self.camera.viewport.size)
+            self.stream.update(self.player.rect.center, self.camera.viewport.size)
+        #draw the platforms around the start ahead of time, the rest get drawn when they first come on screen
+        self.static_chunks.build(self.gameEntities, self.player.rect.inflate(self.PRERENDER_SIZE))
+
+    def make_entity(self, section, record):
+        '''makes an entity from its dictionary in one of the sections of a level file'''
+        record = {key: value for (key, value) in record.items()}
+        if section == 'enemies':
+            return Enemy(self.player, **record)
+        elif section == 'doors':
+            return Door(self, **record)
+        elif section == 'dynamicEntities':
+            return game_object.DynamicObject(**record)
+        elif section == 'staticEntities':
+            return game_object.StaticObject(**record)
+        else:
+            return game_object.SceneryObject(self.texture_cache, **record)
+
+    def index_for(self, layer):
+        '''gets the spatial index that goes with a layer'''
+        if layer is self.gameEntities:
+            return self.broadphase
+        elif layer is self.backGroundEntities:
+            return self.backGroundIndex
+        else:
+            return self.foreGroundIndex
     
+    def add_entity(self, layer, entity, order=None):
+        '''adds an entity to a layer and keeps its index up to date - order puts it in place instead of at the end'''
+        index = self.index_for(layer)
+        if order is None:
+            layer.append(entity)
+        else:
+            #go before the first entity that comes after it
+            position = len(layer)
+            for i, other in enumerate(layer):
+                if index.order.get(other, order) > order:
+                    position = i
+                    break
+            layer.insert(position, entity)
+        index.insert(entity, order)
+        if entity.type == 'static':
+            self.static_chunks.insert(entity)
+
+    def remove_entity(self, layer, entity):
+        '''removes an entity from a layer and keeps its index up to date'''
+        layer.remove(entity)
+        self.index_for(layer).remove(entity)
+        self.static_chunks.remove(entity)
+
+    def remove_entities(self, layer, entities):
+        '''removes a set of entities from a layer in one pass'''
+        layer[:] = [entity for entity in layer if entity not in entities]
+        index = self.index_for(layer)
+        for entity in entities:
+            index.remove(entity)
+            self.static_chunks.remove(entity)
+
+    def move_entity(self, entity):
+        '''re-buckets an entity that was moved outside of the physics'''
+        for layer in [self.backGroundEntities, self.gameEntities, self.foreGroundEntities]:
+            index = self.index_for(layer)
+            if entity in index:
+                index.move(entity)
+        self.static_chunks.move(entity)
+
+    def wake_area(self, rect):
+        '''wakes up sleeping objects touching a rectangle'''
+        game_object.wake_area(self.gameEntities, rect, self.broadphase)
+
+    def wake_all(self):
+        '''wakes up every sleeping object'''
+        for entity in self.gameEntities:
+            if entity.dynamic:
+                entity.wake()
+
     def load_game(self, file_name):
-        '''loads game from text file'''
+        '''loads game from a json or binary level file, or takes it from the prefetcher if a door already loaded it'''
         if file_name is not None:
-            with open('../levels/' + file_name +'.txt') as file:
-                self.from_dictionary(json.loads(file.read()))
+            prepared = self.prefetcher.take(file_name)
+            if prepared is not None:
+                #the surfaces it adopted are kept until the next load, so the scenery made here picks them up
+                self.from_dictionary(prepared['dictionary'])
+            else:
+                self.from_dictionary(level_format.read_level(file_name))
+            self.prefetcher.clear()
                 
     def start_game(self, file_name):
         '''start the game'''
@@ -207,8 +421,15 @@ class GameState():
             self.load_game(file_name)
             self.camera = Camera(900, 600, self.player)
             self.camera.resize(pygame.display.get_surface())
+            self.snapshot = snapshot.Snapshot(self)
+            self.frame.clear()
     def reset_game(self):
-        '''resets the game'''
+        '''resets the game to the snapshot, or sends everything back to its spawn if there isn't one'''
+        self.frame.clear()
+        if self.snapshot is not None:
+            self.snapshot.restore(self)
+            return
         for entity in self.gameEntities:
             if entity.dynamic:
-                entity.reset()
\ No newline at end of file
+                entity.reset()
+                self.broadphase.move(entity)
\ No newline at end of file
@@ -6,39 +6,83 @@ Objects used in game
 
 import pygame, sys
 import math
+import copy
+import time
 import physics
 import utilities
+from profiler import profile
+
+def wake_area(entities, rect, broadphase=None):
+    '''wakes up any sleeping dynamic objects touching a rectangle'''
+    if broadphase is not None:
+        entities = broadphase.query(rect)
+    for entity in entities:
+        if entity.dynamic and entity.sleeping and rect.colliderect(entity.rect):
+            entity.wake()
+
+def scenery_color(parallax):
+    '''scenery gets lighter the further back it is'''
+    if parallax <= 1:
+        color_adjust = 255-255*parallax
+    else:
+        color_adjust = 0
+    return (color_adjust,color_adjust,color_adjust)
 
 #base class for all object in game
 class GameObject(object):
-    #these are the parameters that you can edit in the editor
+    #slots instead of a __dict__ per object keeps big levels small - values every object of a class shares stay on the class
+    __slots__ = ['color', 'select_offset', 'rect', '_offsets', 'shape', 'screen_key', 'screen_source', 'screen_corners']
+    type = 'scenery'
+    dynamic = False
+    parallax = 1 #scenery has its own, everything else moves with the camera
     def __init__(self, x, y, offsets):
         '''base init for all entities'''
-        self.type = 'scenery'
         self.color = (0,0,0)
-        self.dynamic = False
-        self.offsets = offsets
         self.select_offset = (0, 0) #used for dragging
         #this is a collision bounding box for select and improved collision checks
         x_offsets = [offset[0] for offset in offsets]
         y_offsets = [offset[1] for offset in offsets]
         self.rect = pygame.Rect(x ,y ,max(x_offsets), max(y_offsets))
+        self.offsets = offsets #also sets up the collision shape
+        #corners on screen, with the camera and world corners they were worked out from
+        self.screen_key = None
+        self.screen_source = None
+        self.screen_corners = None
+    @property
+    def offsets(self):
+        '''offsets of the corners from x and y'''
+        return self._offsets
+    @offsets.setter
+    def offsets(self, offsets):
+        '''changing the offsets rebuilds the collision shape'''
+        self._offsets = offsets
+        self.shape = physics.Shape(self.rect, offsets)
     def update(self, dt):
         '''base update - other objects expand on this'''
         pass
     def draw(self, screen, camera):
         '''basic draw function'''
-        #translates points and draws polygon
-        translate_points = camera.apply(self.get_corners())
-        pygame.draw.polygon(screen, self.color, translate_points, 0)
+        pygame.draw.polygon(screen, self.color, self.get_screen_corners(camera), 0)
     def debug_draw(self, screen, camera):
         '''debug draw for eraser tool'''
         #translates points and draws rect
         position = camera.apply_single((self.rect.x, self.rect.y))
         pygame.draw.rect(screen, (255,0,0), (position[0], position[1], self.rect.width, self.rect.height), 2)
+    def get_bounds(self):
+        '''rectangle around everything the object draws - used for culling'''
+        return self.rect
     def get_corners(self):
-        '''apply offsets from x and y'''
-        return [(self.rect.x + offset[0], self.rect.y + offset[1]) for offset in self.offsets]
+        '''apply offsets from x and y - the list is shared with the shape so don't change it'''
+        return self.shape.get_corners()
+    def get_screen_corners(self, camera):
+        '''corners on screen - only worked out again when the camera or the object has moved'''
+        source = self.shape.get_corners() #a new list whenever the object moves or changes shape
+        key = camera.get_key(self.parallax)
+        if key != self.screen_key or source is not self.screen_source:
+            self.screen_corners = camera.apply(source, self.parallax)
+            self.screen_key = key
+            self.screen_source = source
+        return self.screen_corners
     def to_dictionary(self):
         '''creates a dictionary of variables for saving'''
         return {
@@ -49,13 +93,14 @@ class GameObject(object):
 
 #includes any objects that are simply scenery
 class StaticObject(GameObject):
+    __slots__ = ['friction']
+    type = 'static'
     #these are the parameters that you can edit in the editor
     ATTRIBUTES = [{'name': 'Friction', 'init': 1, 'max': 2, 'min': 0, 'step': 0.1}]
     def __init__(self, x, y, offsets, attributes):
         '''Static Objects are used for platforms - they don't move'''
         GameObject.__init__(self, x, y, offsets)
         self.friction = attributes[0]
-        self.type = 'static'
     def to_dictionary(self):
         '''creates a dictionary of variables for saving specifically for Static Objects''' 
         #http://stackoverflow.com/questions/38987/how-to-merge-two-python-dictionaries-in-a-single-expression
@@ -64,6 +109,8 @@ class StaticObject(GameObject):
 
 #includes any objects that are simply scenery
 class SceneryObject(GameObject):
+    __slots__ = ['parallax', 'scale', 'rotation', 'image_dir', 'hasImage', 'image', '__weakref__'] #the texture cache keeps weak references to its users
+    type = 'scenery'
     #these are the parameters that you can edit in the editor
     ATTRIBUTES = [{'name': 'Parallax', 'init': 1, 'max': 2, 'min': 0, 'step': 0.01},
                   {'name': 'Scale', 'init': 1, 'max': 2, 'min': 0.1, 'step': 0.1},
@@ -83,22 +130,13 @@ class SceneryObject(GameObject):
                 self.hasImage = False
             else:
                 self.image_dir = texture_cache.image_list[self.image_dir]
+        self.color = scenery_color(self.parallax)
         if self.hasImage:
-            surface = texture_cache.load(self.image_dir)
-            width, height = surface.get_size()
+            width, height = texture_cache.get_size(self.image_dir)
             self.rect.width = int(width * self.scale)
             self.rect.height = int(height * self.scale)
-            surface = pygame.transform.scale(surface, (self.rect.width, self.rect.height))
-            surface = pygame.transform.rotate(surface, self.rotation)
-            self.image = surface
-        self.type = 'scenery'
-        if self.parallax <= 1:
-            color_adjust = 255-255*self.parallax
-        else:
-            color_adjust = 0
-        self.color = (color_adjust,color_adjust,color_adjust)
-        if self.hasImage:
-            self.image = self.colorize(self.color)
+            #scenery drawn the same way shares one surface
+            self.image = texture_cache.load_transformed(self.image_dir, self.scale, self.rotation, self.color, self)
         
     def draw(self, screen, camera):
         '''draw function with parallax'''
@@ -106,33 +144,21 @@ class SceneryObject(GameObject):
         if self.hasImage:
             translate = camera.apply_single((self.rect.x, self.rect.y), self.parallax)
             screen.blit(self.image, translate)
-        else:   
-            translate_points = camera.apply(self.get_corners(), self.parallax)
-            pygame.draw.polygon(screen, self.color, translate_points, 0)
+        else:
+            GameObject.draw(self, screen, camera)
     
+    def get_bounds(self):
+        '''images can be bigger than the rect once they are rotated'''
+        if self.hasImage:
+            return pygame.Rect(self.rect.topleft, self.image.get_size())
+        return self.rect
+
     def debug_draw(self, screen, camera):
         '''debug draw with parallax'''
         #translates points and draws rect
         position = camera.apply_single((self.rect.x, self.rect.y), self.parallax)
         pygame.draw.rect(screen, (255,0,0), (position[0], position[1], self.rect.width, self.rect.height), 2)
         
-    def colorize(self, newColor):
-        """
-        Create a "colorized" copy of a surface (replaces RGB values with the given color, preserving the per-pixel alphas of
-        original).
-        :param image: Surface to create a colorized copy of
-        :param newColor: RGB color to use (original alpha values are preserved)
-        :return: New colorized Surface instance
-        """
-        surface = self.image.copy()
-    
-        # zero out RGB values
-        surface.fill((0, 0, 0, 255), None, pygame.BLEND_RGBA_MULT)
-        # add in new RGB values
-        surface.fill(newColor[0:3] + (0,), None, pygame.BLEND_RGBA_ADD)
-    
-        return surface
-    
     def to_dictionary(self):
         '''creates a dictionary of variables for saving specifically for Static Objects''' 
         #http://stackoverflow.com/questions/38987/how-to-merge-two-python-dictionaries-in-a-single-expression
@@ -141,37 +167,52 @@ class SceneryObject(GameObject):
 
 #includes any objects that collide with player
 class DynamicObject(GameObject):
+    __slots__ = ['mass', 'inv_mass', 'spawn', 'vel', 'pos', 'prev_pos', 'fric', 'collision_ground', 'collision_wall',
+                 'onground', 'onwall', 'frozen', 'sleeping', 'sleep_timer', 'rest_position',
+                 'wall_rect', 'test_offset', 'test_shape']
+    type = 'dynamic'
+    dynamic = True
     #these are the parameters that you can edit in the editor
     ATTRIBUTES = [{'name': 'Mass', 'init': 10, 'max': 100, 'min': 1, 'step': 1}]
     #create universal gravity constant
     GRAVITY = 2000
+    SLEEP_VELOCITY = 10 #horizontal speed an object has to stay under to fall asleep
+    SLEEP_TIME = 0.5 #seconds an object has to rest before it falls asleep
+    grav = GRAVITY
+    friction = 1
+    bounce = 0.5
+    air_fric = 0.5
+    can_sleep = True
+    #variables that change while the game runs - saved by snapshots so a level can be put back without loading it
+    STATE = ['pos', 'vel', 'prev_pos', 'fric', 'collision_ground', 'collision_wall', 'onground', 'onwall',
+             'frozen', 'sleeping', 'sleep_timer', 'rest_position']
     def __init__(self, x, y, offsets, attributes):
         '''Dynamic Objects move and collide - parent of the player'''
         GameObject.__init__(self, x, y, offsets)
         #set variables
         self.mass = attributes[0]
-        self.friction = 1
         self.inv_mass = 1/self.mass
         self.spawn = (x, y)
-        self.type = 'dynamic'
-        self.dynamic = True 
         self.vel = pygame.math.Vector2(0,0)
         self.pos = pygame.math.Vector2(x,y)
-        self.grav = self.GRAVITY
-        self.bounce = 0.5
-        self.air_fric = 0.5
+        self.prev_pos = pygame.math.Vector2(x,y) #position before the last update, for drawing between steps
         self.fric = 0
         self.collision_ground = False #flag for collisions
         self.collision_wall = False #flag for collisions
         self.onground = False
         self.onwall = 0
         self.frozen = False
+        #sleeping objects skip their update until something wakes them
+        self.sleeping = False
+        self.sleep_timer = 0
+        self.rest_position = (x, y)
         #adjust collision
         self.adjust_collision()
         
-    def update(self, dt, entities):
+    def update(self, dt, entities, broadphase=None):
         '''updates and applies physics'''
-        if self.frozen: #dont do anything
+        self.prev_pos.x, self.prev_pos.y = self.pos.x, self.pos.y
+        if self.frozen or self.sleeping: #dont do anything
             return
         #move the character
         self.pos += self.vel * 0.5 * dt
@@ -184,24 +225,55 @@ class DynamicObject(GameObject):
         #physics check
         self.collision_ground = False
         self.collision_wall = False
-        for entity in entities:
+        timing = profile.enabled #timed by hand, spans cost too much this many times a frame
+        counts = physics.stats.frame if physics.stats.enabled else None
+        #only check the entities near the object if there is a broadphase
+        if broadphase is not None:
+            if timing:
+                start = time.perf_counter()
+            candidates = broadphase.query(self.rect.union(self.wall_rect))
+            if timing:
+                profile.add('update.physics.broadphase', time.perf_counter() - start)
+        else:
+            candidates = entities
+        if counts is not None:
+            counts['bodies'] += 1
+            counts['pairs'] += sum(1 for entity in candidates if entity != self)
+        for entity in candidates:
             if entity != self:
-                if self.wall_rect.colliderect(entity):
+                #passing the rect itself is much faster than letting pygame look it up on the entity
+                if self.wall_rect.colliderect(entity.rect):
                     self.collision_wall = True
-                if self.rect.colliderect(entity):
+                    if counts is not None:
+                        counts['wall_hits'] += 1
+                if self.rect.colliderect(entity.rect):
+                    if entity.dynamic and entity.sleeping: #touching an awake object wakes it
+                        entity.wake()
+                    if timing:
+                        start = time.perf_counter()
                     if physics.collide_test(self, entity):
                         self.collision_ground = True
+                        if counts is not None:
+                            counts['ground_hits'] += 1
                     vec = physics.collide(self, entity)
+                    if timing:
+                        profile.add('update.physics.narrowphase', time.perf_counter() - start)
+                    if counts is not None:
+                        counts['rect_hits'] += 1
+                        counts['mtvs'] += bool(vec)
                     if vec:
-                        self.on_collide(entities, entity)
+                        self.on_collide(entities, entity, broadphase)
                         self.pos -= vec
                         self.move()
                         #correct the velocity based on the vec return --- Nathan Brink
-                        res_vec = pygame.math.Vector2(physics.normalize(vec)) * physics.dot_product(physics.normalize(vec), self.vel)
+                        normal = physics.normalize(vec)
+                        res_vec = pygame.math.Vector2(normal) * physics.dot_product(normal, self.vel)
                         if entity.dynamic and not res_vec[1] > 0:
                             phy_vec = physics.resolve_collision(self, entity)
                             if not phy_vec: #sometimes phy_vec returns false
                                 self.vel -= res_vec
+                            elif counts is not None:
+                                counts['impulses'] += 1
                         else:
                             self.vel -= res_vec
                         if res_vec[1] > 0:
@@ -219,10 +291,65 @@ class DynamicObject(GameObject):
         if not self.collision_wall or self.onground:
             #reset wall variables if not wall collision
             self.onwall = 0
-    def on_collide(self, entities, entity):
+        #fall asleep after resting on the ground for a while
+        if self.can_sleep and self.onground and abs(self.vel.x) < self.SLEEP_VELOCITY and self.rect.topleft == self.rest_position:
+            self.sleep_timer += dt
+            if self.sleep_timer > self.SLEEP_TIME:
+                self.sleep()
+        else:
+            self.sleep_timer = 0
+            self.rest_position = self.rect.topleft
+        #re-bucket the object now that it has moved
+        if broadphase is not None and self in broadphase:
+            if timing:
+                start = time.perf_counter()
+            broadphase.move(self)
+            if timing:
+                profile.add('update.physics.broadphase', time.perf_counter() - start)
+    def draw(self, screen, camera):
+        '''draws the object between its last and current position'''
+        offset_x, offset_y = self.interpolation_offset(camera.alpha) if camera.alpha < 1 else (0, 0)
+        if offset_x == 0 and offset_y == 0: #not moving, so the cached corners are right
+            GameObject.draw(self, screen, camera)
+        else:
+            corners = [(x + offset_x, y + offset_y) for x, y in self.get_corners()]
+            pygame.draw.polygon(screen, self.color, camera.apply(corners), 0)
+
+    def interpolation_offset(self, alpha):
+        '''offset from the current position back towards the last one'''
+        return ((self.prev_pos.x - self.pos.x) * (1 - alpha), (self.prev_pos.y - self.pos.y) * (1 - alpha))
+
+    def on_collide(self, entities, entity, broadphase=None):
         '''called when object collides'''
         pass
 
+    def get_state(self):
+        '''copies the variables in STATE'''
+        return dict((name, copy.copy(getattr(self, name))) for name in self.STATE)
+
+    def set_state(self, state):
+        '''puts back variables from get_state and moves the object to where it was'''
+        for name, value in state.items():
+            setattr(self, name, copy.copy(value))
+        self.move()
+
+    def sleep(self):
+        '''stops updating the object until it is woken'''
+        self.sleeping = True
+        self.vel *= 0
+
+    def wake(self):
+        '''starts updating the object again'''
+        self.sleeping = False
+        self.sleep_timer = 0
+
+    def remove_entity(self, entities, entity, broadphase=None):
+        '''removes an entity from the game, and the broadphase if there is one'''
+        if entity in entities:
+            entities.remove(entity)
+        if broadphase is not None:
+            broadphase.remove(entity)
+
     def move(self):
         '''moves the object'''
         self.rect.x = self.pos.x
@@ -233,10 +360,13 @@ class DynamicObject(GameObject):
     def reset(self):
         '''resets the variable and sends it to the spawn point'''
         self.vel *= 0
+        self.wake()
         self.rect.x = self.spawn[0]
         self.rect.y = self.spawn[1]
         self.pos[0] = self.rect.x
         self.pos[1] = self.rect.y
+        self.prev_pos[0] = self.rect.x
+        self.prev_pos[1] = self.rect.y
     
     def adjust_collision(self):
         ''''inflate the rect for reading of onground and onwall'''
@@ -246,10 +376,11 @@ class DynamicObject(GameObject):
         self.test_offset = self.offsets[:]
         for i in range(len(self.test_offset)):
             self.test_offset[i] = (self.test_offset[i][0], self.test_offset[i][1]+2) 
+        self.test_shape = physics.Shape(self.rect, self.test_offset)
     
     def get_corners_test(self):
         '''get corners for the floor check'''
-        return [(self.rect.x + offset[0], self.rect.y + offset[1]) for offset in self.test_offset]
+        return list(self.test_shape.get_corners())
     
     def to_dictionary(self):
         '''creates a dictionary of variables for saving specifically for Dynamic Objects'''
@@ -0,0 +1,148 @@
+''' steps a level without a window and reports how fast it runs
+usage: python headless.py level1 --ticks 2000 --rate 120 --keys right,up --stream --counters --batch
+'''
+import os, sys
+import argparse
+import time
+
+def setup():
+    '''starts pygame with the dummy video driver so no window or gpu is needed'''
+    os.environ['SDL_VIDEODRIVER'] = 'dummy'
+    os.environ['SDL_AUDIODRIVER'] = 'dummy'
+    #levels and images are loaded relative to the scripts folder
+    os.chdir(os.path.dirname(os.path.abspath(__file__)))
+    import pygame
+    pygame.init()
+    #images need a display mode to convert, the dummy driver gives one without a window
+    return pygame.display.set_mode((900, 600))
+
+def count_entities(game):
+    '''counts entities by layer and by type'''
+    counts = {'background': len(game.backGroundEntities),
+              'game': len(game.gameEntities),
+              'foreground': len(game.foreGroundEntities)}
+    for layer in [game.backGroundEntities, game.gameEntities, game.foreGroundEntities]:
+        for entity in layer:
+            counts[entity.type] = counts.get(entity.type, 0) + 1
+    return counts
+
+def candidate_pairs(game):
+    '''the pairs the dynamic objects would run collide on this tick - the broadphase candidates whose rects overlap'''
+    pairs = []
+    for entity in game.gameEntities:
+        if entity.dynamic:
+            for other in game.broadphase.query(entity.rect.union(entity.wall_rect)):
+                if other != entity and entity.rect.colliderect(other.rect):
+                    pairs.append((entity, other))
+    return pairs
+
+def compare_batch(pairs, repeats=20):
+    '''
+    times collide and collide_test one pair at a time against physics.collide_batch on the same pairs
+    also counts the pairs where the two disagree
+    '''
+    import physics
+    start = time.perf_counter()
+    for repeat in range(repeats):
+        single = [(physics.collide(entity1, entity2), physics.collide_test(entity1, entity2)) for entity1, entity2 in pairs]
+    single_time = (time.perf_counter() - start)/repeats
+    start = time.perf_counter()
+    for repeat in range(repeats):
+        mtvs, hits, grounds = physics.collide_batch(pairs)
+    batch_time = (time.perf_counter() - start)/repeats
+    mismatches = 0
+    for (mtv, ground), batch_mtv, hit, batch_ground in zip(single, mtvs, hits, grounds):
+        if bool(mtv) != hit or ground != batch_ground:
+            mismatches += 1
+        elif mtv and (abs(mtv[0] - batch_mtv[0]) > 1e-6 or abs(mtv[1] - batch_mtv[1]) > 1e-6):
+            mismatches += 1
+    return {'pairs': len(pairs), 'single_time': single_time, 'batch_time': batch_time, 'mismatches': mismatches}
+
+def run(level, ticks, rate=120, keys=(), stream=False, counters=False, batch=False):
+    '''
+    loads a level with GameState.load_game and runs GameState.update for a number of ticks
+    the phases are timed by the profiler spans in the update, counters also counts the collision work each tick with physics.stats
+    batch compares physics.collide_batch with collide on the candidate pairs left at the end of the run
+    '''
+    import physics
+    from profiler import profile
+    from game import GameState
+    from menu import MenuState
+    from editor import EditorState
+    game = GameState([MenuState, GameState, EditorState])
+    game.streaming = stream
+    start = time.perf_counter()
+    game.start_game(level)
+    load_time = time.perf_counter() - start
+    game.pause = False
+    for key in keys:
+        if key not in game.keys:
+            raise ValueError('unknown key: ' + key)
+        game.keys[key] = True
+    dt = 1.0/rate
+    profile.enable()
+    physics.stats.enable(counters)
+    start = time.perf_counter()
+    for tick in range(ticks):
+        game.update(dt)
+        profile.end_frame()
+        physics.stats.end_frame()
+    total = time.perf_counter() - start
+    #the spans inside GameState.update, like 'physics' and 'physics.broadphase'
+    phase_times = dict((name[len('update.'):], seconds) for name, seconds in profile.totals.items() if name.startswith('update.'))
+    counts = {'mean': physics.stats.mean(), 'peak': dict(physics.stats.peak)} if counters else None
+    profile.enable(False)
+    physics.stats.enable(False)
+    game.exit() #stops the prefetch thread before the display goes away
+    batch_stats = compare_batch(candidate_pairs(game)) if batch else None
+    return {'level': level,
+            'ticks': ticks,
+            'rate': rate,
+            'load_time': load_time,
+            'total_time': total,
+            'ticks_per_second': ticks/total if total else 0,
+            'phase_times': phase_times,
+            'entities': count_entities(game),
+            'stream': game.stream.stats() if game.stream else None,
+            'counters': counts,
+            'batch': batch_stats}
+
+def report(stats):
+    '''prints the results of a run'''
+    print('level: %s' % stats['level'])
+    print('loaded in %.2f ms' % (stats['load_time']*1000))
+    print('%d ticks at %d Hz in %.3f s - %.1f ticks per second' % (stats['ticks'], stats['rate'], stats['total_time'], stats['ticks_per_second']))
+    print('entities:')
+    for name, count in sorted(stats['entities'].items()):
+        print('    %-12s %d' % (name, count))
+    if stats['stream']:
+        print('streamed: %(loaded)d of %(records)d loaded, %(parked)d frozen' % stats['stream'])
+    print('phases:')
+    for name, phase_time in sorted(stats['phase_times'].items()): #puts every phase right under the one it is part of
+        percent = 100*phase_time/stats['total_time'] if stats['total_time'] else 0
+        label = '  '*name.count('.') + name.split('.')[-1]
+        print('    %-14s %8.3f ms/tick %5.1f%%' % (label, 1000*phase_time/max(stats['ticks'], 1), percent))
+    if stats.get('counters'):
+        print('collision work per tick:')
+        for name, mean in stats['counters']['mean'].items():
+            print('    %-13s %10.1f mean %8d peak' % (name, mean, stats['counters']['peak'][name]))
+    if stats.get('batch'):
+        print('narrowphase on %(pairs)d pairs: %(single_ms).3f ms one at a time, %(batch_ms).3f ms batched, %(mismatches)d mismatches'
+              % dict(stats['batch'], single_ms=stats['batch']['single_time']*1000, batch_ms=stats['batch']['batch_time']*1000))
+
+def main():
+    parser = argparse.ArgumentParser(description='step a level without rendering')
+    parser.add_argument('level', help='name of the level in the levels folder, without an extension')
+    parser.add_argument('--ticks', type=int, default=1000, help='number of physics ticks to run')
+    parser.add_argument('--rate', type=int, default=120, help='physics ticks per second of game time')
+    parser.add_argument('--keys', default='', help='keys held for the whole run, like right,up,dash')
+    parser.add_argument('--stream', action='store_true', help='only load the part of the level around the camera')
+    parser.add_argument('--counters', action='store_true', help='count the collision work done each tick')
+    parser.add_argument('--batch', action='store_true', help='compare the numpy batched narrowphase with collide at the end (needs numpy)')
+    args = parser.parse_args()
+    setup()
+    keys = [key for key in args.keys.split(',') if key]
+    report(run(args.level, args.ticks, args.rate, keys, args.stream, args.counters, args.batch))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,200 @@
+''' compact binary level format, and a converter between it and the json levels the editor saves
+usage: python level_format.py level1 --to binary   (writes levels/level1.lvl)
+       python level_format.py level1 --to json     (writes levels/level1.txt)
+
+layout - little endian, every section is stored as columns so loading is mostly copying arrays
+    magic 'SRSU', version (uint16)
+    for each section in SECTIONS:
+        count (uint32), text kind (uint8), attribute width (uint8)
+        x, y, offset counts, offsets, attributes, text - each an array
+        offsets and attributes are numbers - ints, or doubles followed by flags marking the ones that were ints
+    string table - count (uint32), then length (uint16) and utf-8 bytes for each string
+each array is its typecode (1 byte), length (uint32) and raw values
+'''
+import os, sys
+import argparse
+import json
+import struct
+from array import array
+
+MAGIC = b'SRSU'
+VERSION = 1
+SECTIONS = ['player', 'enemies', 'doors', 'dynamicEntities', 'staticEntities', 'backGroundEntities', 'foreGroundEntities']
+#where a section keeps its text - doors have a link, scenery can have an image as its last attribute
+TEXT_NONE = 0
+TEXT_LINK = 1
+TEXT_LAST_ATTRIBUTE = 2
+TEXT_KINDS = {'doors': TEXT_LINK, 'backGroundEntities': TEXT_LAST_ATTRIBUTE, 'foreGroundEntities': TEXT_LAST_ATTRIBUTE}
+
+def write_numbers(parts, values):
+    '''adds a list of numbers as ints if it can, as doubles and int flags if it has to'''
+    if all(type(value) is int for value in values):
+        write_array(parts, array('i', values))
+        write_array(parts, array('B'))
+    else:
+        write_array(parts, array('d', values))
+        write_array(parts, array('B', [type(value) is int for value in values]))
+
+def read_numbers(data, position):
+    '''reads a list of numbers written by write_numbers, returns it and where it ends'''
+    values, position = read_array(data, position)
+    flags, position = read_array(data, position)
+    values = values.tolist()
+    if flags:
+        values = [int(value) if flag else value for value, flag in zip(values, flags)]
+    return values, position
+
+def write_array(parts, values):
+    '''adds an array to the bytes being written'''
+    if sys.byteorder != 'little':
+        values = array(values.typecode, values)
+        values.byteswap()
+    parts.append(struct.pack('<cI', values.typecode.encode(), len(values)))
+    parts.append(values.tobytes())
+
+def read_array(data, position):
+    '''reads an array from the bytes, returns it and where it ends'''
+    typecode, length = struct.unpack_from('<cI', data, position)
+    position += 5
+    values = array(typecode.decode())
+    end = position + length * values.itemsize
+    values.frombytes(data[position:end])
+    if sys.byteorder != 'little':
+        values.byteswap()
+    return values, end
+
+def dumps(dictionary):
+    '''turns a level dictionary into bytes'''
+    strings = []
+    string_index = {}
+    def text_id(text):
+        if text not in string_index:
+            string_index[text] = len(strings)
+            strings.append(text)
+        return string_index[text]
+    parts = [MAGIC, struct.pack('<H', VERSION)]
+    for section in SECTIONS:
+        entities = dictionary.get(section, [])
+        if section == 'player':
+            entities = [entities]
+        text_kind = TEXT_KINDS.get(section, TEXT_NONE)
+        width = len(entities[0].get('attributes', [])) if entities else 0
+        attributes = []
+        text = []
+        for entity in entities:
+            values = list(entity.get('attributes', []))
+            if len(values) != width:
+                raise ValueError('every entity in ' + section + ' needs the same number of attributes')
+            if text_kind == TEXT_LINK:
+                text.append(text_id(entity.get('link', '')))
+            elif text_kind == TEXT_LAST_ATTRIBUTE and width and isinstance(values[-1], str):
+                text.append(text_id(values[-1]))
+                values[-1] = -1
+            else:
+                text.append(-1)
+            attributes.extend(values)
+        parts.append(struct.pack('<IBB', len(entities), text_kind, width))
+        write_array(parts, array('i', [entity['x'] for entity in entities]))
+        write_array(parts, array('i', [entity['y'] for entity in entities]))
+        write_array(parts, array('H', [len(entity['offsets']) for entity in entities]))
+        write_numbers(parts, [value for entity in entities for offset in entity['offsets'] for value in offset])
+        write_numbers(parts, attributes)
+        write_array(parts, array('i', text))
+    parts.append(struct.pack('<I', len(strings)))
+    for text in strings:
+        encoded = text.encode('utf-8')
+        parts.append(struct.pack('<H', len(encoded)))
+        parts.append(encoded)
+    return b''.join(parts)
+
+def loads(data):
+    '''turns bytes back into a level dictionary'''
+    if data[:4] != MAGIC:
+        raise ValueError('not a binary level')
+    version, = struct.unpack_from('<H', data, 4)
+    if version != VERSION:
+        raise ValueError('unknown level version %d' % version)
+    position = 6
+    sections = []
+    for section in SECTIONS:
+        count, text_kind, width = struct.unpack_from('<IBB', data, position)
+        position += 6
+        xs, position = read_array(data, position)
+        ys, position = read_array(data, position)
+        offset_counts, position = read_array(data, position)
+        offsets, position = read_numbers(data, position)
+        attributes, position = read_numbers(data, position)
+        text, position = read_array(data, position)
+        sections.append((section, count, text_kind, width, (xs.tolist(), ys.tolist(), offset_counts.tolist(), offsets, attributes, text.tolist())))
+    #the strings come last
+    string_count, = struct.unpack_from('<I', data, position)
+    position += 4
+    strings = []
+    for i in range(string_count):
+        length, = struct.unpack_from('<H', data, position)
+        position += 2
+        strings.append(data[position:position+length].decode('utf-8'))
+        position += length
+    dictionary = {}
+    for section, count, text_kind, width, columns in sections:
+        xs, ys, offset_counts, offsets, attributes, text = columns
+        #pair up every offset in one go, then hand each entity its share
+        flat = iter(offsets)
+        points = list(map(list, zip(flat, flat)))
+        entities = []
+        offset_position = 0
+        for i in range(count):
+            offset_end = offset_position + offset_counts[i]
+            entity = {'x': xs[i], 'y': ys[i], 'offsets': points[offset_position:offset_end]}
+            offset_position = offset_end
+            if text_kind == TEXT_LINK:
+                entity['link'] = strings[text[i]]
+            else:
+                entity['attributes'] = attributes[i*width:(i+1)*width]
+                if text_kind == TEXT_LAST_ATTRIBUTE and text[i] >= 0:
+                    entity['attributes'][-1] = strings[text[i]]
+            entities.append(entity)
+        dictionary[section] = entities[0] if section == 'player' else entities
+    return dictionary
+
+def level_path(file_name):
+    '''finds the file for a level - the newest of the binary and json versions, the json one if they are as new'''
+    #max keeps the first of equal times, and the json goes first since the editor only saves json
+    paths = [path for path in ['../levels/' + file_name + '.txt', '../levels/' + file_name + '.lvl'] if os.path.isfile(path)]
+    if not paths:
+        raise IOError('no level called ' + file_name)
+    return max(paths, key=os.path.getmtime)
+
+def read_level(file_name):
+    '''reads a level in either format into a dictionary'''
+    with open(level_path(file_name), 'rb') as file:
+        data = file.read()
+    if data[:4] == MAGIC:
+        return loads(data)
+    return json.loads(data.decode('utf-8'))
+
+def convert(file_name, to):
+    '''writes a level out in the other format, returns the new file'''
+    dictionary = read_level(file_name)
+    if to == 'binary':
+        path = '../levels/' + file_name + '.lvl'
+        with open(path, 'wb') as file:
+            file.write(dumps(dictionary))
+    else:
+        path = '../levels/' + file_name + '.txt'
+        with open(path, 'w') as file:
+            file.write(json.dumps(dictionary))
+    return path
+
+def main():
+    parser = argparse.ArgumentParser(description='convert levels between json and binary')
+    parser.add_argument('levels', nargs='+', help='names of levels in the levels folder, without an extension')
+    parser.add_argument('--to', choices=['binary', 'json'], default='binary')
+    args = parser.parse_args()
+    #levels are found relative to the scripts folder
+    os.chdir(os.path.dirname(os.path.abspath(__file__)))
+    for file_name in args.levels:
+        print(convert(file_name, args.to))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+''' makes random levels in the same format the editor saves, used for benchmarking big levels
+'''
+import os, sys
+import json
+import random
+
+SCENERY_IMAGES = ['scenery/grass0.png', 'scenery/grass1.png', 'scenery/tree0.png', 'scenery/tree1.png', 'scenery/tree2.png']
+
+def box(width, height):
+    '''offsets for a rectangle'''
+    return [[0, 0], [0, height], [width, height], [width, 0]]
+
+def generate_level(platforms=50, crates=20, enemies=10, doors=2, scenery=100, seed=0):
+    '''makes a level dictionary that GameState.from_dictionary can load'''
+    rand = random.Random(seed)
+    #platforms go left to right and wander up and down
+    static = []
+    x, y = -200, 200
+    for i in range(max(platforms, 1)):
+        width = rand.randint(200, 600)
+        height = rand.randint(40, 100)
+        static.append({'x': x, 'y': y, 'offsets': box(width, height), 'attributes': [1]})
+        x += width + rand.randint(50, 250)
+        y = max(-1000, min(1000, y + rand.randint(-150, 150)))
+    right = x
+    def on_platform(width, height):
+        '''random position just above a platform'''
+        platform = rand.choice(static)
+        platform_width = platform['offsets'][2][0]
+        return (platform['x'] + rand.randint(0, max(platform_width - width, 0)),
+                platform['y'] - height - rand.randint(0, 200))
+    dynamic = []
+    for i in range(crates):
+        width, height = rand.randint(30, 90), rand.randint(30, 90)
+        x, y = on_platform(width, height)
+        dynamic.append({'x': x, 'y': y, 'offsets': box(width, height), 'attributes': [rand.randint(5, 40)]})
+    enemy_list = []
+    for i in range(enemies):
+        width, height = rand.randint(25, 40), rand.randint(40, 90)
+        x, y = on_platform(width, height)
+        enemy_list.append({'x': x, 'y': y, 'offsets': box(width, height),
+                           'attributes': [10, rand.randint(1, 10), rand.randint(5, 15), rand.randint(1, 10)]})
+    door_list = []
+    for i in range(doors):
+        x, y = on_platform(60, 100)
+        door_list.append({'x': x, 'y': y, 'offsets': box(60, 100), 'link': ''})
+    #most scenery goes behind the game, some in front
+    backGround = []
+    foreGround = []
+    for i in range(scenery):
+        if rand.random() < 0.8:
+            parallax = round(rand.uniform(0.05, 1), 2)
+            layer = backGround
+        else:
+            parallax = round(rand.uniform(1.05, 1.5), 2)
+            layer = foreGround
+        x = rand.randint(-400, right)
+        y = rand.randint(-1200, 1000)
+        if rand.random() < 0.7:
+            attributes = [parallax, round(rand.uniform(0.3, 1.5), 1), rand.choice([0, 0, 0, 90, 180]), rand.choice(SCENERY_IMAGES)]
+            offsets = box(1, 1) #images set their own size
+        else:
+            attributes = [parallax, 1, 0, -1]
+            offsets = box(rand.randint(50, 400), rand.randint(50, 400))
+        layer.append({'x': x, 'y': y, 'offsets': offsets, 'attributes': attributes})
+    backGround.sort(key=lambda scenery: scenery['attributes'][0])
+    foreGround.sort(key=lambda scenery: scenery['attributes'][0])
+    first = static[0]
+    return {'player': {'x': first['x'] + 20, 'y': first['y'] - 60, 'offsets': box(20, 40), 'attributes': [10]},
+            'enemies': enemy_list,
+            'doors': door_list,
+            'dynamicEntities': dynamic,
+            'staticEntities': static,
+            'backGroundEntities': backGround,
+            'foreGroundEntities': foreGround}
+
+def write_level(name, dictionary):
+    '''writes a level to the levels folder, name can include a sub folder'''
+    path = '../levels/' + name + '.txt'
+    folder = os.path.dirname(path)
+    if not os.path.isdir(folder):
+        os.makedirs(folder)
+    with open(path, 'w') as file:
+        file.write(json.dumps(dictionary))
+    return path
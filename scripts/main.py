@@ -5,12 +5,21 @@ Runs the game
 '''
 import pygame, os, sys
 import utilities
+import physics
+from profiler import profile
 from game import GameState
 from menu import MenuState
 from editor import EditorState
 
-def main():
+PHYSICS_RATE = 120 #physics steps per second, None steps once a frame with the frame time
+MAX_STEPS = 5 #most physics steps that get caught up in one frame
+MAX_DELTA = 0.25 #longest frame time that gets simulated, stops a hitch from blowing up the physics
+FRAME_CAP = 240 #most frames drawn per second
+IDLE_WAIT = 250 #milliseconds an idle state sleeps waiting for input before drawing again
+
+def main(physics_rate=PHYSICS_RATE, frame_cap=FRAME_CAP):
     #http://thepythongamebook.com/en:pygame:step006
+    #https://gafferongames.com/post/fix_your_timestep/
     #set up the game and run the main loop`
     #os.environ['SDL_VIDEO_CENTERED'] = '1' #center window on the screen
     pygame.init() #initiate pygame
@@ -20,26 +29,79 @@ def main():
     pygame.display.set_icon(utilities.load('icon.png')) #set image for application
     states = [MenuState, GameState, EditorState] #used for switching states within states
     currentState = MenuState(states)
+    step = 1.0/physics_rate if physics_rate else None
+    accumulator = 0 #time that still has to be simulated
+    drawnState = None #state drawn last frame, a new one always updates the whole screen
     #main game loop
     while True:
-        deltaTime = clock.tick()/1000.0 #get time pasted between each frame in seconds
-        for event in pygame.event.get():
+        if currentState.idle():
+            #nothing is moving, so sleep until there is input instead of drawing the same frame again and again
+            events = [event for event in [pygame.event.wait(IDLE_WAIT)] + pygame.event.get() if event.type != pygame.NOEVENT]
+            clock.tick() #the time spent waiting doesn't get simulated
+            deltaTime = step or 1.0/frame_cap
+            accumulator = 0
+        else:
+            deltaTime = min(clock.tick(frame_cap)/1000.0, MAX_DELTA) #get time pasted between each frame in seconds
+            events = pygame.event.get()
+        profile.start('events')
+        for event in events:
             if event.type == pygame.QUIT: #if the application is closed - terminate all processes
                 pygame.quit()
                 sys.exit()
                 return
             elif event.type == pygame.VIDEORESIZE: #if screen is resized
                 screen = pygame.display.set_mode(event.dict['size'],pygame.HWSURFACE | pygame.DOUBLEBUF | pygame.RESIZABLE)
+                drawnState = None
+                currentState.frame.clear() #the new screen starts out blank
                 if hasattr(currentState, 'camera'):
                     currentState.camera.resize(screen)
                 #realign buttons
                 for button in currentState.buttons:
                     button.realign(currentState.camera)
+            elif event.type == pygame.KEYDOWN and event.key == pygame.K_F3: #profiler overlay
+                profile.toggle()
+                physics.stats.enable(profile.enabled)
+                currentState.frame.clear()
             else:
-                currentState = currentState.eventHandler(event) or currentState
-        currentState.draw(pygame.draw, screen)
-        currentState.update(deltaTime)
-        pygame.display.flip() #updates the screen
+                nextState = currentState.eventHandler(event) or currentState
+                if nextState is not currentState:
+                    currentState.exit()
+                    currentState = nextState
+        profile.stop('events')
+        profile.start('update')
+        if step:
+            #run the physics in fixed steps and carry over the time left
+            accumulator += deltaTime
+            steps = 0
+            while accumulator >= step and steps < MAX_STEPS:
+                currentState.update(step)
+                accumulator -= step
+                steps += 1
+            if steps == MAX_STEPS:
+                accumulator %= step #drop the time that could not be caught up
+            alpha = accumulator/step
+        else:
+            currentState.update(deltaTime)
+            alpha = 1
+        profile.stop('update')
+        #draw between the last two physics steps
+        profile.start('draw')
+        currentState.camera.interpolate(alpha)
+        dirty = currentState.draw(pygame.draw, screen)
+        profile.stop('draw')
+        if profile.enabled:
+            overlay = profile.draw(screen, physics.stats.mean()) #frames without a physics step count zero
+            if dirty is not None:
+                dirty.append(overlay)
+        profile.start('present')
+        if dirty is None or currentState is not drawnState:
+            pygame.display.flip() #updates the screen
+        else:
+            pygame.display.update(dirty) #only the parts that changed
+        profile.stop('present')
+        profile.end_frame()
+        physics.stats.end_frame()
+        drawnState = currentState
 
 if __name__ == "__main__":
     main()
@@ -8,6 +8,7 @@ import pygame, sys
 import math
 import utilities
 import button
+import frame_cache
 from camera import Camera
 
 class MenuState():
@@ -16,6 +17,7 @@ class MenuState():
         self.states = states
         self.camera = Camera(900, 600, 1)
         self.camera.resize(pygame.display.get_surface())
+        self.frame = frame_cache.FrameCache() #the background, reused under the buttons
         pygame.mouse.set_visible(True) # Make the mouse invisible
         self.keys = {'up': False, 'down': False, 'left': False, 'right': False} #dictionary for key presses
         #create buttons and other a e s t h e s t i c s
@@ -46,13 +48,33 @@ class MenuState():
         '''loop through objects and run logic'''
         button.buttons_update(self, self.buttons)
         self.camera.update(self.keys, dt)
+
+    def idle(self):
+        '''if nothing is moving - the menu only changes when there is input'''
+        return True
+
+    def exit(self):
+        '''called when the menu is switched away from'''
+        pass
         
     def draw(self, draw, screen):
-        '''loop through objects and draw them'''
+        '''
+        loop through objects and draw them
+        returns the parts of the screen that changed, or None if all of it did
+        '''
+        #the logo only moves with the camera, so just the buttons get drawn again
+        key = (self.camera.get_key(), screen.get_size())
+        rects = [entity.get_bounds() for entity in self.buttons]
+        if self.frame.valid(key):
+            dirty = self.frame.restore(screen, rects)
+            button.buttons_draw(self, screen, self.buttons)
+            return dirty
         screen.fill(pygame.Color(255, 255, 255))
         #draw logo
         self.draw_logo(screen, self.camera)
+        self.frame.save(screen, key, rects)
         button.buttons_draw(self, screen, self.buttons)
+        return None
             
     def eventHandler(self, event):
         '''handles user inputs'''
@@ -5,6 +5,10 @@ parent class for all objects used in game
 '''
 import pygame, sys
 import math
+try:
+    import numpy #only needed for the batched collision checks
+except ImportError:
+    numpy = None
 
 '''
 referenced material for creating library
@@ -14,15 +18,88 @@ http://wiki.roblox.com/index.php?title=2D_Collision_Detection
 http://codereview.stackexchange.com/questions/47111/implementation-of-sat-separating-axis-theorem
 http://stackoverflow.com/questions/6013333/separating-axis-theorem-and-python
 '''
+class Shape(object):
+    __slots__ = ['rect', 'offsets', 'axis', 'corners', 'position', 'projections', 'projected']
+    def __init__(self, rect, offsets):
+        '''collision shape that caches its axis and world corners'''
+        self.rect = rect
+        self.offsets = offsets
+        #the axis don't change when the shape moves, so only work them out once
+        self.axis = get_unique_axis(offsets)
+        self.corners = None
+        self.position = None
+        self.projections = None #corners projected onto the axis, for shapes that get collided against
+        self.projected = None #position the projections are for
+
+    def get_corners(self):
+        '''world corners of the shape - only rebuilt when the rect has moved'''
+        position = (self.rect.x, self.rect.y)
+        if position != self.position:
+            x, y = position
+            self.corners = [(x + offset[0], y + offset[1]) for offset in self.offsets]
+            self.position = position
+        return self.corners
+
+    def get_projections(self):
+        '''the shape projected onto each of its own axis - platforms never move so this is almost always cached'''
+        corners = self.get_corners()
+        if self.projected != self.position:
+            self.projections = [project(axis, corners) for axis in self.axis]
+            self.projected = self.position
+        return self.projections
+
+class Stats(object):
+    COUNTERS = ['bodies', 'pairs', 'wall_hits', 'rect_hits', 'ground_hits', 'mtvs', 'impulses']
+    def __init__(self):
+        '''
+        counts the collision work done each frame - DynamicObject.update only counts while it is enabled
+        bodies: objects stepped, pairs: objects they were checked against, wall_hits: pairs touching the wall rect,
+        rect_hits: pairs whose rects touched - each gets one collide_test and one collide call,
+        ground_hits: collide_test hits, mtvs: collisions pushed apart, impulses: resolve_collision bounces
+        '''
+        self.enabled = False
+        self.reset()
+
+    def enable(self, enabled=True):
+        '''starts or stops counting, from zero'''
+        self.enabled = enabled
+        self.reset()
+
+    def reset(self):
+        '''forgets everything counted so far'''
+        self.frame = dict.fromkeys(self.COUNTERS, 0) #counted so far this frame
+        self.last = dict.fromkeys(self.COUNTERS, 0) #the last finished frame
+        self.total = dict.fromkeys(self.COUNTERS, 0)
+        self.peak = dict.fromkeys(self.COUNTERS, 0) #most in one frame
+        self.frames = 0
+
+    def end_frame(self):
+        '''finishes the frame and starts counting the next one from zero'''
+        if not self.enabled:
+            return
+        for name, count in self.frame.items():
+            self.total[name] += count
+            self.peak[name] = max(self.peak[name], count)
+        self.last = self.frame
+        self.frame = dict.fromkeys(self.COUNTERS, 0)
+        self.frames += 1
+
+    def mean(self):
+        '''average count per frame'''
+        return dict((name, count/max(self.frames, 1)) for name, count in self.total.items())
+
+stats = Stats() #the physics of every dynamic object counts into this one
+
 def collide(entity1, entity2):
     '''check for collisions between entities and then send resolving vector'''
     overlap = math.inf
     #obtain axis from entity2 assuming entity1 is the player and won't change its rotation
-    axis_list = get_axis(entity2.get_corners())
-    for axis in axis_list:
+    axis_list = entity2.shape.axis
+    entity1_corners = entity1.shape.get_corners()
+    entity2_projections = entity2.shape.get_projections()
+    for axis, entity2_projection in zip(axis_list, entity2_projections):
         # Project the shapes onto the axis
-        entity1_projection = project(axis, entity1.get_corners())
-        entity2_projection = project(axis, entity2.get_corners())
+        entity1_projection = project(axis, entity1_corners)
         #test if the projections overlap
         for projection in [(entity1_projection[1], entity2_projection[0], 1), (entity2_projection[1], entity1_projection[0], -1)]:
             p1, p2, sign = projection
@@ -38,17 +115,66 @@ def collide(entity1, entity2):
 def collide_test(entity1, entity2):
     '''check for collisions between entities with the dynamics test offsets only for checking'''
     #obtain axis from entity2 assuming entity1 is the player and won't change its rotation
-    axis_list = get_axis(entity2.get_corners())
-    for axis in axis_list:
+    axis_list = entity2.shape.axis
+    entity1_corners = entity1.test_shape.get_corners()
+    entity2_projections = entity2.shape.get_projections()
+    for axis, entity2_projection in zip(axis_list, entity2_projections):
         # Project the shapes onto the axis
-        entity1_projection = project(axis, entity1.get_corners_test())
-        entity2_projection = project(axis, entity2.get_corners())
+        entity1_projection = project(axis, entity1_corners)
         #test if the projections overlap
         for projection in [(entity1_projection[1], entity2_projection[0], 1), (entity2_projection[1], entity1_projection[0], -1)]:
             p1, p2, sign = projection
             if not p1 > p2:
                 return False
     return True
+def collide_batch(pairs):
+    '''
+    runs collide and collide_test on a list of (entity1, entity2) pairs in one go with numpy
+    returns (mtvs, hits, grounds) - mtvs is an array of resolving vectors that are zero where hits is False,
+    grounds is what collide_test would return for each pair
+    '''
+    if numpy is None:
+        raise ImportError('collide_batch needs numpy')
+    corners1 = pad_points([pair[0].shape.get_corners() for pair in pairs])
+    test_corners1 = pad_points([pair[0].test_shape.get_corners() for pair in pairs])
+    corners2 = pad_points([pair[1].shape.get_corners() for pair in pairs])
+    axis = pad_points([pair[1].shape.axis for pair in pairs])
+    mtvs, hits = sat_batch(corners1, corners2, axis)
+    grounds = sat_batch(test_corners1, corners2, axis)[1]
+    return mtvs, hits, grounds
+
+def sat_batch(corners1, corners2, axis):
+    '''
+    vectorized version of collide - corners are (pairs, points, 2) arrays and axis is (pairs, axis, 2)
+    returns the resolving vectors and a flag for each pair that overlaps
+    '''
+    if len(axis) == 0:
+        return numpy.zeros((0, 2)), numpy.zeros(0, dtype=bool)
+    #project every corner onto every axis of its pair
+    projection1 = numpy.einsum('npd,nad->nap', corners1, axis)
+    projection2 = numpy.einsum('npd,nad->nap', corners2, axis)
+    min1, max1 = projection1.min(axis=2), projection1.max(axis=2)
+    min2, max2 = projection2.min(axis=2), projection2.max(axis=2)
+    #the same two overlap tests collide does, in the same order
+    overlaps = numpy.stack((max1 - min2, -(max2 - min1)), axis=2)
+    hits = numpy.all((max1 > min2) & (max2 > min1), axis=1)
+    #argmin takes the first of any ties like the strict less than in collide
+    overlaps = overlaps.reshape(len(axis), -1)
+    best = numpy.argmin(numpy.abs(overlaps), axis=1)
+    rows = numpy.arange(len(axis))
+    mtvs = axis[rows, best//2] * overlaps[rows, best][:, None]
+    mtvs[~hits] = 0
+    return mtvs, hits
+
+def pad_points(point_lists):
+    '''stacks lists of points into one array, repeating the last point so they are all the same length'''
+    length = max([len(points) for points in point_lists] or [0])
+    padded = numpy.empty((len(point_lists), length, 2))
+    for i, points in enumerate(point_lists):
+        padded[i, :len(points)] = points
+        padded[i, len(points):] = points[-1]
+    return padded
+
 def get_axis(corners):
     '''gets all the axis necessary for collisio'''
     axis = []
@@ -58,18 +184,26 @@ def get_axis(corners):
         vec = normalize(perpendicular(vec))
         axis.append(vec)
     return axis
+
+def get_unique_axis(corners):
+    '''gets the axis without parallel repeats - a rectangle only needs two'''
+    unique = []
+    for axis in get_axis(corners):
+        for other in unique:
+            if axis == (0, 0) or other == (0, 0):
+                if axis == other:
+                    break
+            elif abs(axis[0]*other[1] - axis[1]*other[0]) < 1e-9:
+                break
+        else:
+            unique.append(axis)
+    return unique
 def project(axis, corners):
     '''project the points on the axis'''
-    min_point = dot_product(corners[0], axis)
-    max_point = min_point
-    for i in range(len(corners)):
-        p = dot_product(corners[i], axis)
-        if (p < min_point):
-            min_point = p
-        elif (p > max_point):
-            max_point = p
-    projection = (min_point, max_point)
-    return projection
+    #same sums as dot_product, without a call per corner
+    axis_x, axis_y = axis
+    points = [x*axis_x + y*axis_y for x, y in corners]
+    return (min(points), max(points))
 
 def perpendicular(vec):
     '''Return the perpendicular vector.'''
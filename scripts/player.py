@@ -5,24 +5,32 @@ child of DynamicObject that the user can control
 '''
 import pygame, sys, math
 import utilities
+import game_object
 from game_object import DynamicObject
 from pygame.tests import camera_test
 
 class Player(DynamicObject):
+    __slots__ = ['past_up', 'past_down', 'past_left', 'past_right', 'past_dash',
+                 'dash_timer', 'can_dash', 'deadly', 'dashed', 'health']
+    type = 'player'
+    max_vel = 3000
+    accel = 2000
+    dash_time = 15 #time spend dashing
+    dash_cool_down = 100 #time until dash can be used
+    dash_boost = 2000 #amount of boost recieved
+    can_sleep = False
+    DASH_WAKE = 300 #distance that sleeping objects get woken up by a dash
+    STATE = DynamicObject.STATE + ['health', 'dash_timer', 'can_dash', 'deadly', 'dashed', 'color',
+                                   'past_up', 'past_down', 'past_left', 'past_right']
     def __init__(self, x, y, offsets, attributes):
         ''' Player game object for moving your character around'''
         DynamicObject.__init__(self, x, y, offsets, attributes)
-        self.type = 'player'
         self.color = (100,0,0)
-        self.max_vel = 3000
-        self.accel = 2000
         self.past_up = self.past_down = self.past_left = self.past_right = True # Past key presses
-        self.dash_time = 15 #time spend dashing
-        self.dash_cool_down = 100 #time until dash can be used
         self.dash_timer = 0 #timer for dash
-        self.dash_boost = 2000 #amount of boost recieved
         self.can_dash = True
         self.deadly = False
+        self.dashed = False #used to wake up objects after a dash
         self.health = 25
         
     def input(self, keys, dt):
@@ -63,9 +71,12 @@ class Player(DynamicObject):
         self.past_right = True if (keys['right']) else False
         self.past_dash = True if (keys['dash']) else False
         
-    def update(self, dt, entities):
+    def update(self, dt, entities, broadphase=None):
         '''update the player and the time for dash'''            
-        DynamicObject.update(self, dt, entities)
+        DynamicObject.update(self, dt, entities, broadphase)
+        if self.dashed: #wake up anything the dash could reach
+            self.dashed = False
+            game_object.wake_area(entities, self.rect.inflate(self.DASH_WAKE*2, self.DASH_WAKE*2), broadphase)
         if self.dash_timer < 0: #if the timer is zero
             if self.deadly: #on dash cooldown
                 self.color = (100,0,0) #revert to old color
@@ -80,7 +91,10 @@ class Player(DynamicObject):
     
     def draw(self, screen, camera):
         DynamicObject.draw(self, screen, camera)
-        #draw the health bar and dash bar
+        self.draw_hud(screen)
+
+    def draw_hud(self, screen):
+        '''draw the health bar and dash bar'''
         pygame.draw.rect(screen, (200,0,0), (10, 10, max(0, 100 * (self.health/25)), 10), 0)
         pygame.draw.rect(screen, (0,0,0), (10, 10, 100, 10), 2)
         pygame.draw.rect(screen, (0,0,200), (10, 30, 100/(1+(self.dash_timer/self.dash_cool_down)), 10), 0)
@@ -95,15 +109,16 @@ class Player(DynamicObject):
             self.vel.y = self.dash_boost * y
             self.vel.x = 0
         self.can_dash = False
+        self.dashed = True
         self.deadly = True
         self.color = self.color = (255,0,0)
         self.dash_timer = self.dash_time   
     
-    def on_collide(self, entities, entity):
+    def on_collide(self, entities, entity, broadphase=None):
         '''called on collision'''
         if entity.type == 'enemy':
             if self.deadly and not entity.frozen: #kill enemy
-                entities.remove(entity)
+                self.remove_entity(entities, entity, broadphase)
             else: #reduce health otherwise
                 self.health -= 1
                
@@ -0,0 +1,116 @@
+''' loads levels on a background thread before the player walks through the door to them
+'''
+import pygame, sys, os
+import threading
+import queue
+import utilities
+import level_format
+import game_object
+
+def prepare_level(file_name, texture_cache):
+    '''
+    reads a level and makes the scenery surfaces it needs that the texture cache doesn't have yet
+    returns the level dictionary, {image: surface} and {(image, scale, rotation, color): surface}
+    '''
+    path = level_format.level_path(file_name)
+    modified = os.path.getmtime(path)
+    dictionary = level_format.read_level(file_name)
+    images = {}
+    transformed = {}
+    for record in dictionary['backGroundEntities'] + dictionary['foreGroundEntities']:
+        parallax, scale, rotation, image_string = record['attributes']
+        if type(image_string).__name__ == 'int':
+            if image_string == -1:
+                continue
+            image_string = texture_cache.image_list[image_string]
+        key = (image_string, scale, rotation, game_object.scenery_color(parallax))
+        #only reads the cache, the main thread is the only one that changes it
+        if key in transformed or key in texture_cache.transformed_dict:
+            continue
+        image = images.get(image_string)
+        if image is None:
+            image = texture_cache.image_dict.get(image_string)
+        if image is None:
+            image = images[image_string] = utilities.decode(image_string) #converted by the texture cache when it is taken
+        transformed[key] = utilities.transform(image, scale, rotation, key[3])
+    return {'path': path, 'modified': modified, 'dictionary': dictionary, 'images': images, 'transformed': transformed}
+
+class LevelPrefetcher(object):
+    def __init__(self, texture_cache):
+        '''loads requested levels one at a time on a worker thread'''
+        self.texture_cache = texture_cache
+        self.requests = queue.Queue()
+        self.results = {} #level -> prepared level, or the error loading it gave
+        self.pending = set() #levels asked for that aren't done yet
+        self.generation = 0 #goes up on clear, loads asked for before that are thrown away
+        self.done = threading.Condition()
+        self.thread = None
+        self.hits = 0 #levels that were ready or loading when they were needed
+        self.misses = 0
+
+    def request(self, file_name):
+        '''starts loading a level in the background if it isn't loaded or loading already'''
+        if not file_name or file_name in self.pending or file_name in self.results:
+            return
+        with self.done:
+            self.pending.add(file_name)
+            self.requests.put((file_name, self.generation))
+        if self.thread is None:
+            #daemon so a level still loading doesn't keep the game open
+            self.thread = threading.Thread(target=self.work, name='level prefetch')
+            self.thread.daemon = True
+            self.thread.start()
+
+    def work(self):
+        '''worker thread loop - returns when it gets None from stop'''
+        while True:
+            request = self.requests.get()
+            if request is None:
+                return
+            file_name, generation = request
+            if generation != self.generation:
+                continue #cleared before it got started
+            try:
+                result = prepare_level(file_name, self.texture_cache)
+            except Exception as e:
+                result = e
+            with self.done:
+                if generation == self.generation:
+                    self.results[file_name] = result
+                    self.pending.discard(file_name)
+                self.done.notify_all()
+
+    def take(self, file_name):
+        '''
+        gets a prefetched level, waiting for it if it is still loading, and gives its surfaces to the texture cache
+        returns None if it was never asked for, failed, or the file changed since
+        '''
+        with self.done:
+            if file_name not in self.pending and file_name not in self.results:
+                self.misses += 1
+                return None
+            while file_name in self.pending:
+                self.done.wait()
+            result = self.results.pop(file_name)
+        if isinstance(result, Exception) or not os.path.isfile(result['path']) or \
+           level_format.level_path(file_name) != result['path'] or os.path.getmtime(result['path']) != result['modified']:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.texture_cache.adopt(result['images'], result['transformed'])
+        return result
+
+    def clear(self):
+        '''forgets levels that have finished loading, and throws away the ones still loading when they finish'''
+        with self.done:
+            self.results = {}
+            self.pending = set()
+            self.generation += 1
+            self.done.notify_all()
+
+    def stop(self):
+        '''clears everything and ends the worker thread, so a state that is left doesn't keep its surfaces alive'''
+        self.clear()
+        if self.thread is not None:
+            self.requests.put(None)
+            self.thread = None
@@ -0,0 +1,103 @@
+''' times the parts of a frame and shows the averages on screen
+spans are named with dots so 'update.physics' is drawn under 'update'
+'''
+import pygame, sys
+import time
+from collections import deque
+
+class Profiler(object):
+    WINDOW = 120 #frames the averages are taken over
+    REFRESH = 15 #frames between redrawing the overlay text
+    def __init__(self, window=WINDOW):
+        '''collects how long each span took per frame - does nothing until it is enabled'''
+        self.enabled = False
+        self.window = window
+        self.history = {} #span -> seconds it took in each of the last frames
+        self.frame = {} #span -> seconds so far this frame
+        self.totals = {} #span -> seconds over every frame since it was turned on
+        self.started = {} #span -> when it was started
+        self.frames = 0
+        self.font = None
+        self.surface = None #overlay text, only redrawn every REFRESH frames
+
+    def toggle(self):
+        '''turns the profiler and its overlay on or off'''
+        self.enable(not self.enabled)
+
+    def enable(self, enabled=True):
+        '''starts or stops timing, from nothing'''
+        self.enabled = enabled
+        self.history = {}
+        self.frame = {}
+        self.totals = {}
+        self.started = {}
+        self.frames = 0
+        self.surface = None
+
+    def start(self, name):
+        '''starts timing a span'''
+        if self.enabled:
+            self.started[name] = time.perf_counter()
+
+    def stop(self, name):
+        '''stops timing a span - a span can run more than once a frame and the times add up'''
+        if self.enabled and name in self.started:
+            self.add(name, time.perf_counter() - self.started.pop(name))
+
+    def add(self, name, seconds):
+        '''adds time to a span that was timed somewhere else'''
+        self.frame[name] = self.frame.get(name, 0) + seconds
+
+    def end_frame(self):
+        '''saves this frame's times'''
+        if not self.enabled:
+            return
+        for name in self.frame:
+            if name not in self.history:
+                self.history[name] = deque([0]*len(next(iter(self.history.values()), [])), self.window)
+        for name, times in self.history.items():
+            times.append(self.frame.get(name, 0))
+        for name, seconds in self.frame.items():
+            self.totals[name] = self.totals.get(name, 0) + seconds
+        self.frame = {}
+        self.frames += 1
+
+    def stats(self):
+        '''mean and 95th percentile of each span in milliseconds'''
+        stats = {}
+        for name, times in self.history.items():
+            ordered = sorted(times)
+            stats[name] = {'mean': 1000*sum(ordered)/max(len(ordered), 1),
+                           'p95': 1000*ordered[min(len(ordered)-1, int(len(ordered)*0.95))] if ordered else 0}
+        return stats
+
+    def draw(self, screen, counts=None):
+        '''
+        draws the overlay in the bottom right corner and returns the rectangle it covers
+        counts is a dictionary of numbers shown under the times, like physics.stats.mean()
+        '''
+        if self.surface is None or self.frames % self.REFRESH == 0:
+            self.surface = self.render(counts)
+        width, height = screen.get_size()
+        rect = self.surface.get_rect(bottomright=(width - 10, height - 10))
+        screen.blit(self.surface, rect)
+        return rect
+
+    def render(self, counts=None):
+        '''draws the averages onto a surface, one span a line'''
+        if self.font is None:
+            self.font = pygame.font.SysFont('monospace', 14)
+        stats = self.stats()
+        lines = ['%-28s %6s %6s' % ('ms', 'mean', 'p95')]
+        for name in sorted(self.history): #puts every span right under the one it is part of
+            label = '  '*name.count('.') + name.split('.')[-1]
+            lines.append('%-28s %6.2f %6.2f' % (label, stats[name]['mean'], stats[name]['p95']))
+        for name, count in (counts or {}).items():
+            lines.append('%-28s %13.1f' % (name, count))
+        line_height = self.font.get_linesize()
+        surface = pygame.Surface((max(self.font.size(line)[0] for line in lines) + 10, line_height*len(lines) + 10))
+        for i, line in enumerate(lines):
+            surface.blit(self.font.render(line, 1, (255,255,255)), (5, 5 + i*line_height))
+        return surface
+
+profile = Profiler() #the one main, the states and the physics all time with
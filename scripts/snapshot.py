@@ -0,0 +1,64 @@
+''' saves the state of a level in memory so it can be put back without loading it again
+'''
+import pygame, sys
+
+class Snapshot(object):
+    def __init__(self, game):
+        '''captures which entities are in each layer, in what order, and the state of everything that moves'''
+        self.layers = [] #(layer, entities in it, their order in the layer's index)
+        for layer in [game.backGroundEntities, game.gameEntities, game.foreGroundEntities]:
+            order = game.index_for(layer).order
+            self.layers.append((layer, list(layer), dict((entity, order[entity]) for entity in layer)))
+        self.states = {} #entity -> state from get_state
+        for entity in game.gameEntities:
+            self.save(entity)
+        self.stream = None
+        if game.stream is not None:
+            self.stream = game.stream.get_state()
+            for entity in self.stream['parked'].values():
+                self.save(entity)
+
+    def save(self, entity):
+        '''saves the state of an entity if it moves'''
+        if entity.dynamic:
+            self.states[entity] = entity.get_state()
+
+    def add(self, game, layer, entity):
+        '''adds an entity placed after the snapshot, as it is now'''
+        for saved_layer, entities, order in self.layers:
+            if saved_layer is layer and entity not in order:
+                #goes after the closest thing before it in the layer that the snapshot has
+                position = layer.index(entity)
+                before = [other for other in layer[:position] if other in order]
+                entities.insert(entities.index(before[-1]) + 1 if before else 0, entity)
+                order[entity] = game.index_for(layer).order[entity]
+        self.save(entity)
+
+    def remove(self, entity):
+        '''forgets an entity that was deleted after the snapshot'''
+        for layer, entities, order in self.layers:
+            if entity in order:
+                entities.remove(entity)
+                del order[entity]
+        self.states.pop(entity, None)
+
+    def restore(self, game):
+        '''puts the game back how it was, reusing the entities that are already made'''
+        for layer, entities, order in self.layers:
+            layer[:] = entities
+            index = game.index_for(layer)
+            #take out what was made since, and put back what was killed
+            for entity in [entity for entity in index.order if entity not in order]:
+                index.remove(entity)
+                game.static_chunks.remove(entity)
+            for entity in entities:
+                if entity not in index:
+                    index.insert(entity, order[entity])
+                    if entity.type == 'static':
+                        game.static_chunks.insert(entity)
+        for entity, state in self.states.items():
+            entity.set_state(state)
+            if entity in game.broadphase:
+                game.broadphase.move(entity)
+        if self.stream is not None:
+            game.stream.set_state(self.stream)
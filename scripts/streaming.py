@@ -0,0 +1,178 @@
+''' streams a level in around the camera, so only the part of the world near the player exists at a time
+'''
+import pygame, sys
+import broadphase
+
+#sections of a level file and the layer their entities go in, in the order GameState.from_dictionary puts them
+SECTIONS = {'dynamicEntities': 'gameEntities',
+            'staticEntities': 'gameEntities',
+            'enemies': 'gameEntities',
+            'backGroundEntities': 'backGroundEntities',
+            'doors': 'backGroundEntities',
+            'foreGroundEntities': 'foreGroundEntities'}
+#sections whose entities move - these get frozen and kept when they are far away instead of thrown out
+MOVING = ['enemies', 'dynamicEntities']
+
+def record_bounds(record, texture_cache=None):
+    '''rectangle around what an entity from a level file would draw, without making it - pass the texture cache for scenery'''
+    width = max(offset[0] for offset in record['offsets'])
+    height = max(offset[1] for offset in record['offsets'])
+    attributes = record.get('attributes', [])
+    if texture_cache is not None and attributes[3] != -1:
+        #scenery with an image, sized like SceneryObject does it
+        image_dir = attributes[3]
+        if type(image_dir).__name__ == 'int':
+            image_dir = texture_cache.image_list[image_dir]
+        width, height = texture_cache.get_size(image_dir)
+        width, height = int(width * attributes[1]), int(height * attributes[1])
+        if attributes[2] % 360:
+            #rotated images grow, but never past their diagonal
+            width = height = int((width**2 + height**2)**0.5) + 1
+    return pygame.Rect(record['x'], record['y'], width, height)
+
+class LevelStream(object):
+    CHUNK_SIZE = 256 #size of the chunks the level gets split into - the camera can move this far between checks
+    MARGIN = 768 #distance past the screen that gets loaded
+    ALWAYS_PARALLAX = 0.25 #scenery this far back barely moves on screen, so it is always loaded
+    def __init__(self, game, dictionary, screen_size, chunk_size=CHUNK_SIZE, margin=MARGIN):
+        '''
+        keeps the entities of a level as records and makes them when the camera gets near them.
+        far away platforms and scenery get thrown out and made again later, far away moving
+        objects get frozen and kept so they stay where they were left
+        '''
+        self.game = game
+        self.margin = margin
+        self.screen_size = tuple(screen_size)
+        self.records = [] #(section, dictionary) for every entity in the level except the player
+        self.rects = [] #record -> where the camera has to be for it to be on screen
+        self.index = broadphase.SpatialHash(chunk_size, self.rects.__getitem__) #chunks of records that aren't loaded
+        self.loaded = {} #record -> entity in the game
+        self.parked = {} #record -> moving entity that was frozen when it got far away
+        self.always = [] #records that never get unloaded
+        self.dead = set() #records of enemies that got killed
+        self.cell = None #chunk the camera was in at the last update
+        for section in SECTIONS:
+            for record in dictionary[section]:
+                self.records.append((section, record))
+                self.rects.append(None)
+        #entities get put in their layers by record, so they keep the level's draw and update order however they stream in
+        #the player comes after everything in the game layer like in a fully loaded level
+        game.broadphase.remove(game.player)
+        game.broadphase.insert(game.player, len(self.records))
+        self.reindex()
+
+    def camera_rect(self, i, entity=None):
+        '''
+        camera positions that put a record on screen - with parallax p something at x is
+        on screen when the camera center is between (x - width/2)/p and (x + width/2)/p
+        '''
+        section, record = self.records[i]
+        scenery = section in ['backGroundEntities', 'foreGroundEntities']
+        if entity is not None:
+            bounds = entity.get_bounds()
+        else:
+            bounds = record_bounds(record, self.game.texture_cache if scenery else None)
+        parallax = record['attributes'][0] if scenery else 1
+        width, height = self.screen_size
+        return pygame.Rect((bounds.left - width//2)/parallax, (bounds.top - height//2)/parallax,
+                           (bounds.width + width)/parallax + 1, (bounds.height + height)/parallax + 1)
+
+    def reindex(self):
+        '''puts every record that isn't loaded into the chunks'''
+        self.index.clear()
+        self.always = []
+        for i, (section, record) in enumerate(self.records):
+            if section in ['backGroundEntities', 'foreGroundEntities'] and record['attributes'][0] < self.ALWAYS_PARALLAX:
+                self.always.append(i)
+                continue
+            self.rects[i] = self.camera_rect(i, self.loaded.get(i, self.parked.get(i)))
+            if i not in self.loaded:
+                self.index.insert(i)
+
+    def near(self, center, distance):
+        '''camera positions within a distance of the camera'''
+        return pygame.Rect(center[0] - distance, center[1] - distance, distance*2, distance*2)
+
+    def update(self, center, screen_size, force=False):
+        '''loads the chunks near the camera and unloads the ones far away - only does work when the camera changes chunks'''
+        if tuple(screen_size) != self.screen_size:
+            self.screen_size = tuple(screen_size)
+            self.reindex()
+            force = True
+        cell = self.index.cell_range(self.near(center, 1))[:2]
+        if cell == self.cell and not force:
+            return
+        self.cell = cell
+        #moving objects load closer than platforms and unload sooner, so the ground under them is always there
+        load_static = self.near(center, self.margin)
+        load_moving = self.near(center, self.margin//2)
+        unload_static = self.near(center, self.margin*2)
+        unload_moving = self.near(center, self.margin)
+        #throw out platforms and scenery that are far away and freeze moving objects
+        removed = {}
+        always = set(self.always)
+        for i, entity in list(self.loaded.items()):
+            if i in always:
+                continue
+            section, record = self.records[i]
+            moving = section in MOVING
+            if moving:
+                if entity not in self.game.broadphase:
+                    del self.loaded[i] #killed while it was loaded, it stays dead
+                    self.dead.add(i)
+                    continue
+                self.rects[i] = self.camera_rect(i, entity)
+            if self.rects[i].colliderect(unload_moving if moving else unload_static):
+                continue
+            del self.loaded[i]
+            if moving:
+                self.parked[i] = entity
+            removed.setdefault(SECTIONS[section], set()).add(entity)
+            self.index.insert(i)
+        for layer, entities in removed.items():
+            self.game.remove_entities(getattr(self.game, layer), entities)
+        #make what is close
+        for i in self.index.query(load_static):
+            section, record = self.records[i]
+            if self.rects[i].colliderect(load_moving if section in MOVING else load_static):
+                self.load(i)
+        for i in self.always:
+            if i not in self.loaded:
+                self.load(i)
+
+    def load(self, i):
+        '''puts the entity for a record into the game, making it if it wasn't frozen'''
+        section, record = self.records[i]
+        entity = self.parked.pop(i, None)
+        if entity is None:
+            entity = self.game.make_entity(section, record)
+        self.index.remove(i)
+        self.loaded[i] = entity
+        self.game.add_entity(getattr(self.game, SECTIONS[section]), entity, i)
+
+    def get_state(self):
+        '''which records are loaded and which are frozen, for snapshots'''
+        return {'loaded': dict(self.loaded), 'parked': dict(self.parked)}
+
+    def set_state(self, state):
+        '''puts back what was loaded and frozen - entities have to be back where they were first'''
+        changed = set(self.loaded) | set(self.parked) | self.dead
+        self.loaded = dict(state['loaded'])
+        self.parked = dict(state['parked'])
+        self.dead = set()
+        #platforms and scenery that stayed unloaded are already in the right chunks
+        always = set(self.always)
+        for i in changed | set(self.loaded) | set(self.parked):
+            if i in always:
+                continue
+            self.index.remove(i)
+            self.rects[i] = self.camera_rect(i, self.loaded.get(i, self.parked.get(i)))
+            if i not in self.loaded:
+                self.index.insert(i)
+        self.cell = None
+
+    def stats(self):
+        '''how much of the level exists right now'''
+        return {'records': len(self.records),
+                'loaded': len(self.loaded),
+                'parked': len(self.parked)}
@@ -5,6 +5,7 @@ Runs the game
 '''
 import pygame, pygame.font, pygame.event, pygame.draw
 from pygame.locals import *
+import utilities
 
 '''source for code: http://www.pygame.org/pcr/inputbox/
 Author: Timothy Downs
@@ -33,8 +34,12 @@ class TextBox():
         else:
             pygame.draw.rect(screen, (255,255,255), self.rect, 1)
         if len(self.text) != 0:
-            screen.blit(self.font.render(self.text, 1, (255,255,255)), (self.rect.x+2, self.rect.y))
+            screen.blit(utilities.render_label(self.font, self.text, (255,255,255)), (self.rect.x+2, self.rect.y))
         
+    def get_bounds(self):
+        '''rectangle the box and its text get drawn in'''
+        return self.rect.union(pygame.Rect((self.rect.x+2, self.rect.y), self.font.size(self.text)))
+
     def key_in(self, event):
         '''ask(screen, question) -> answer'''
         if event.type == pygame.KEYDOWN:
@@ -5,6 +5,8 @@ contains utilities used for uncommon functions
 '''
 
 import pygame, sys
+from collections import OrderedDict
+import weakref
 
 def load(image_location, alpha=True):
     ''' CS 108
@@ -29,6 +31,65 @@ def load(image_location, alpha=True):
         myfont = pygame.font.SysFont("monospace", 16)
         return myfont.render("Couldn't load " + image_location, 1, (0,0,0))
 
+def decode(image_location):
+    '''
+    Loads an image without converting it for the display, so it can be done off the main thread
+    the image always gets per pixel alpha, the same as load would give it
+    (string) -> pygame surface
+    '''
+    surface = pygame.image.load('../images/' + image_location)
+    if not surface.get_flags() & pygame.SRCALPHA:
+        alpha_surface = pygame.Surface(surface.get_size(), pygame.SRCALPHA, 32)
+        alpha_surface.blit(surface, (0, 0))
+        surface = alpha_surface
+    return surface
+
+def colorize(image, newColor):
+    """
+    Create a "colorized" copy of a surface (replaces RGB values with the given color, preserving the per-pixel alphas of
+    original).
+    :param image: Surface to create a colorized copy of
+    :param newColor: RGB color to use (original alpha values are preserved)
+    :return: New colorized Surface instance
+    """
+    surface = image.copy()
+
+    # zero out RGB values
+    surface.fill((0, 0, 0, 255), None, pygame.BLEND_RGBA_MULT)
+    # add in new RGB values
+    surface.fill(newColor[0:3] + (0,), None, pygame.BLEND_RGBA_ADD)
+
+    return surface
+
+def transform(image, scale, rotation, color):
+    '''
+    scales, rotates and colorizes an image
+    (pygame surface, float, float, tuple) -> pygame surface
+    '''
+    width, height = image.get_size()
+    surface = pygame.transform.scale(image, (int(width * scale), int(height * scale)))
+    surface = pygame.transform.rotate(surface, rotation)
+    return colorize(surface, tuple(color))
+
+LABEL_CACHE_SIZE = 256 #labels kept around - typing in a textbox keeps making new ones
+label_cache = OrderedDict() #(font, text, color, bold) -> surface
+
+def render_label(font, text, color):
+    '''
+    renders text with a font, reusing the surface from last time if the same text was rendered the same way
+    the surface is shared, so only blit it
+    (pygame font, string, tuple) -> pygame surface
+    '''
+    key = (font, text, tuple(color), font.get_bold())
+    surface = label_cache.get(key)
+    if surface is None:
+        surface = label_cache[key] = font.render(text, 1, color)
+        if len(label_cache) > LABEL_CACHE_SIZE:
+            label_cache.popitem(last=False)
+    else:
+        label_cache.move_to_end(key)
+    return surface
+
 def merge_dicts(x, y):
     '''
     merges two dictionaries
@@ -42,24 +103,153 @@ class Texture_cache:
     '''
     Models a texture cache 
     Texture cache makes the game only load images that have not already or need to be loaded
+    Once the surfaces go over the byte budget, the least recently used ones that nothing is using get dropped
     CS 108
     Created Fall 2014
     Texture Cache
     @author: Kristofer Brink (kpb23)
     '''
-    def __init__(self):
+    BUDGET = 64 * 1024 * 1024 #bytes of surfaces kept around
+    def __init__(self, budget=BUDGET):
         '''
-        ()-> Texture_cache
+        (int)-> Texture_cache
         '''
         self.image_dict = {}
         self.image_list = []
+        self.size_dict = {} #image -> size, kept after the image is dropped
+        self.transformed_dict = {} #(image, scale, rotation, color) -> surface shared by everything drawn that way
+        self.recent = OrderedDict() #('image' or 'transformed', key) of every surface, least recently used first
+        self.users = {} #('image' or 'transformed', key) -> weak set of the objects drawing with it
+        self.budget = budget
+        self.resident_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
         
+    def register(self, image_string):
+        ''' Adds an image to the image list without loading it
+        (str) -> None
+        '''
+        if not image_string in self.image_list:
+            self.image_list.append(image_string)
+
     def load(self, image_string):
         ''' Loads an image
         (str) -> pygame surface
         '''
-        if not image_string in self.image_dict:
-            self.image_dict[image_string] = load(image_string)
-            self.image_list.append(image_string)
-        return self.image_dict[image_string]
-        
\ No newline at end of file
+        surface = self.image_dict.get(image_string)
+        if surface is None:
+            surface = load(image_string)
+            self.image_dict[image_string] = surface
+            self.size_dict[image_string] = surface.get_size()
+            self.register(image_string)
+            self.add('image', image_string, surface)
+        else:
+            self.use('image', image_string)
+        return surface
+
+    def get_size(self, image_string):
+        ''' Size of an image, without keeping it loaded
+        (str) -> (int, int)
+        '''
+        if not image_string in self.size_dict:
+            self.load(image_string)
+        return self.size_dict[image_string]
+
+    def load_transformed(self, image_string, scale, rotation, color, user=None):
+        ''' Loads an image that is scaled, rotated and colorized, sharing it with anything else that asks for the same one
+        the user keeps it from being dropped for as long as the user exists
+        (str, float, float, tuple, object) -> pygame surface
+        '''
+        key = (image_string, scale, rotation, tuple(color))
+        if user is not None:
+            self.users.setdefault(('transformed', key), weakref.WeakSet()).add(user)
+        surface = self.transformed_dict.get(key)
+        if surface is None:
+            surface = transform(self.load(image_string), scale, rotation, color)
+            self.transformed_dict[key] = surface
+            self.add('transformed', key, surface)
+        else:
+            self.use('transformed', key)
+        return surface
+
+    def adopt(self, images, transformed):
+        ''' Takes in surfaces that were made somewhere else, like on a loading thread
+        they are converted for the display here, since only the main thread can do that
+        nothing uses them until the level's scenery is made, so they don't make anything get dropped until the next load
+        (dictionary, dictionary) -> None
+        '''
+        for image_string, surface in images.items():
+            if not image_string in self.image_dict:
+                surface = surface.convert_alpha()
+                self.image_dict[image_string] = surface
+                self.size_dict[image_string] = surface.get_size()
+                self.register(image_string)
+                self.add('image', image_string, surface, False)
+        for key, surface in transformed.items():
+            if not key in self.transformed_dict:
+                surface = surface.convert_alpha()
+                self.transformed_dict[key] = surface
+                self.add('transformed', key, surface, False)
+
+    def add(self, kind, key, surface, evict=True):
+        ''' Counts a new surface and drops old ones if it goes over budget
+        (str, object, pygame surface, bool) -> None
+        '''
+        self.misses += 1
+        self.recent[(kind, key)] = None
+        self.resident_bytes += surface_bytes(surface)
+        if evict:
+            self.evict()
+
+    def use(self, kind, key):
+        ''' Marks a surface as recently used
+        (str, object) -> None
+        '''
+        self.hits += 1
+        self.recent.move_to_end((kind, key))
+
+    def in_use(self, kind, key):
+        ''' Checks if anything that still exists is drawing with a surface
+        (str, object) -> bool
+        '''
+        return bool(self.users.get((kind, key)))
+
+    def evict(self):
+        ''' Drops the least recently used surfaces that nothing is using until the cache is under budget
+        () -> None
+        '''
+        if self.resident_bytes <= self.budget:
+            return
+        for kind, key in list(self.recent):
+            if self.resident_bytes <= self.budget:
+                break
+            dictionary = self.image_dict if kind == 'image' else self.transformed_dict
+            if self.in_use(kind, key):
+                continue
+            self.resident_bytes -= surface_bytes(dictionary.pop(key))
+            del self.recent[(kind, key)]
+            self.users.pop((kind, key), None)
+            self.evictions += 1
+
+    def stats(self):
+        ''' Counters for how the cache is doing
+        () -> dictionary
+        '''
+        requests = self.hits + self.misses
+        return {'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits/requests if requests else 0,
+                'evictions': self.evictions,
+                'resident_bytes': self.resident_bytes,
+                'budget': self.budget,
+                'images': len(self.image_dict),
+                'transformed': len(self.transformed_dict)}
+
+def surface_bytes(surface):
+    '''
+    memory a surface takes up
+    (pygame surface) -> int
+    '''
+    width, height = surface.get_size()
+    return width * height * surface.get_bytesize()